@@ -0,0 +1,191 @@
+"""
+Region-level aggregation of per-country World Bank series.
+
+This module collapses per-country indicator series into per-region, per-year
+summary statistics (mean, median, min, max, count) so overview charts can
+plot a handful of regions instead of hundreds of countries. Series are packed
+into country x year arrays and reduced with grouped numpy operations.
+"""
+
+import warnings
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+from dataset import VersionedCache
+
+
+# Maximum number of aggregate results kept in memory
+AGGREGATE_CACHE_SIZE = 64
+
+_aggregate_cache = VersionedCache(AGGREGATE_CACHE_SIZE)
+
+
+def series_to_matrix(series: Dict[str, Dict[str, float]], codes: List[str], years: List[str]) -> np.ndarray:
+    """
+    Pack a {country: {year: value}} series into a dense country x year array.
+
+    Args:
+        series: Indicator values organized by country and year
+        codes: Country codes, one per row
+        years: Year strings, one per column
+
+    Returns:
+        Float array of shape (len(codes), len(years)) with NaN for missing values
+    """
+    matrix = np.full((len(codes), len(years)), np.nan)
+    year_index = {year: col for col, year in enumerate(years)}
+
+    for row, code in enumerate(codes):
+        for year, value in series.get(code, {}).items():
+            col = year_index.get(year)
+            if col is not None and value is not None:
+                matrix[row, col] = value
+
+    return matrix
+
+
+def summarize_groups(values: np.ndarray, groups: np.ndarray, group_count: int,
+                     weights: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Compute per-group, per-column summary statistics.
+
+    Args:
+        values: Country x year array with NaN for missing values
+        groups: Group index for each row of ``values``
+        group_count: Number of distinct groups
+        weights: Optional country x year weight array; when given, ``mean``
+            is the weighted mean over rows that have both a value and a weight
+
+    Returns:
+        Dictionary mapping statistic name to a group x year array
+    """
+    shape = (group_count, values.shape[1])
+    stats = {
+        'mean': np.full(shape, np.nan),
+        'median': np.full(shape, np.nan),
+        'min': np.full(shape, np.nan),
+        'max': np.full(shape, np.nan),
+        'count': np.zeros(shape, dtype=int),
+    }
+
+    present = ~np.isnan(values)
+
+    with warnings.catch_warnings():
+        # Columns with no data in a group are expected; they stay NaN
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+
+        for group in range(group_count):
+            rows = groups == group
+            block = values[rows]
+            stats['count'][group] = present[rows].sum(axis=0)
+            stats['mean'][group] = np.nanmean(block, axis=0)
+            stats['median'][group] = np.nanmedian(block, axis=0)
+            stats['min'][group] = np.nanmin(block, axis=0)
+            stats['max'][group] = np.nanmax(block, axis=0)
+
+            if weights is not None:
+                block_weights = weights[rows]
+                usable = present[rows] & ~np.isnan(block_weights)
+                weight_sum = np.where(usable, block_weights, 0.0).sum(axis=0)
+                weighted_sum = np.where(usable, block * block_weights, 0.0).sum(axis=0)
+                weighted_mean = weighted_sum / weight_sum
+                # Fall back to the plain mean for years without any weights
+                stats['mean'][group] = np.where(weight_sum > 0, weighted_mean, stats['mean'][group])
+
+    return stats
+
+
+def aggregate_by_region(indicator_data: Dict[str, Dict[str, Dict[str, float]]],
+                        regions: Dict[str, str],
+                        start_year: int,
+                        end_year: int,
+                        weights: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, Any]:
+    """
+    Aggregate per-country indicator series into per-region yearly summaries.
+
+    Args:
+        indicator_data: Mapping of indicator name (e.g. 'gdp') to its
+            {country: {year: value}} series
+        regions: Mapping of country code to region name; countries missing
+            from this mapping are skipped
+        start_year: First year of the output range
+        end_year: Last year of the output range
+        weights: Optional {country: {year: weight}} series used for weighted means
+
+    Returns:
+        Dictionary keyed by region name. Each region holds its member
+        ``countries`` and, per indicator, a {year: {mean, median, min, max, count}}
+        mapping containing only years with at least one observation.
+    """
+    codes = sorted(regions)
+    years = [str(year) for year in range(start_year, end_year + 1)]
+
+    region_names, groups = np.unique([regions[code] for code in codes], return_inverse=True)
+    weight_matrix = series_to_matrix(weights, codes, years) if weights is not None else None
+
+    result = {
+        name: {'countries': [code for code, group in zip(codes, groups) if group == index]}
+        for index, name in enumerate(region_names.tolist())
+    }
+
+    for indicator, series in indicator_data.items():
+        values = series_to_matrix(series, codes, years)
+        stats = summarize_groups(values, groups, len(region_names), weight_matrix)
+
+        for index, name in enumerate(region_names.tolist()):
+            yearly = {}
+            for col in np.flatnonzero(stats['count'][index]):
+                yearly[years[col]] = {
+                    'mean': float(stats['mean'][index, col]),
+                    'median': float(stats['median'][index, col]),
+                    'min': float(stats['min'][index, col]),
+                    'max': float(stats['max'][index, col]),
+                    'count': int(stats['count'][index, col]),
+                }
+            result[name][indicator] = yearly
+
+    return result
+
+
+def get_cached_aggregate(key: Hashable) -> Optional[Dict[str, Any]]:
+    """
+    Look up a cached aggregate result.
+
+    Args:
+        key: Hashable cache key
+
+    Returns:
+        The cached result, or None on a miss or once it has expired
+    """
+    return _aggregate_cache.get(key)
+
+
+def store_aggregate(key: Hashable, result: Dict[str, Any]) -> None:
+    """
+    Store an aggregate result, evicting the least recently used entries.
+
+    Args:
+        key: Hashable cache key
+        result: Aggregate result to cache
+    """
+    _aggregate_cache.put(key, result)
+
+
+def cached_aggregate(key: Hashable, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Return a cached aggregate result, computing and storing it on a miss.
+
+    Args:
+        key: Hashable cache key including the dataset version
+        compute: Zero-argument callable producing the result
+
+    Returns:
+        The cached or freshly computed result
+    """
+    return _aggregate_cache.get_or_compute(key, compute)
+
+
+def clear_aggregate_cache() -> None:
+    """Drop every cached aggregate result."""
+    _aggregate_cache.clear()
@@ -2,25 +2,45 @@
 Flask application for serving GDP and fertility rate data from World Bank API.
 
 This application provides RESTful endpoints for fetching and serving data
-to the frontend visualization component.
+to the frontend visualization component. Besides the combined /data
+endpoint, every indicator in the registry (see indicators.py) is served
+from /data/<indicator>, and /indicators lists them.
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 from flask_cors import CORS
 import logging
+import os
 from typing import Dict, Any
 
+from compression import init_compression
+from dataset import get_dataset_info, get_dataset_version, get_snapshot, publish_snapshot
+from indicators import INDICATORS, fetch_error
+from ingest import describe_indicators
+from query_params import parse_aggregate_params, parse_fill_param
+from refresher import DatasetRefresher
+from snapshot import load_snapshot
+from structured_logging import (
+    SAMPLED,
+    configure_logging,
+    get_logging_stats,
+    init_request_logging,
+    record_request_scope
+)
+from upstream import get_upstream_stats
 from data_fetcher import (
+    DEFAULT_COUNTRIES,
     fetch_combined_data,
-    fetch_gdp_data,
-    fetch_fertility_data,
+    fetch_indicator_data,
+    fetch_region_aggregates,
+    fill_indicator_data,
     get_available_countries,
     validate_country_codes
 )
 
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging: JSON lines written off the request thread, hot path sampled
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app
@@ -29,6 +49,22 @@ app = Flask(__name__)
 # Configure CORS to allow frontend requests
 CORS(app, origins=['*'])
 
+# One structured access record per request; registered first so it sees cache hits
+init_request_logging(app)
+
+# Compress data responses and cache the encoded bodies
+response_cache = init_compression(app)
+
+# Serve from a dataset snapshot file when one is configured
+SNAPSHOT_PATH = os.environ.get('GDP_VIZ_SNAPSHOT')
+if SNAPSHOT_PATH and os.path.exists(SNAPSHOT_PATH):
+    publish_snapshot(load_snapshot(SNAPSHOT_PATH))
+
+# Keep the dataset current in the background when enabled
+refresher = None
+if os.environ.get('GDP_VIZ_REFRESH') == '1':
+    refresher = DatasetRefresher(snapshot_path=SNAPSHOT_PATH).start()
+
 
 @app.errorhandler(400)
 def bad_request(error):
@@ -52,7 +88,16 @@ def internal_error(error):
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
-    return jsonify({'status': 'healthy', 'message': 'GDP Fertility Viz API is running'})
+    dataset_info = get_dataset_info()
+    return jsonify({
+        'status': 'healthy',
+        'message': 'GDP Fertility Viz API is running',
+        'dataset_version': dataset_info['version'],
+        'dataset': dataset_info,
+        'response_cache': response_cache.stats(),
+        'upstream': get_upstream_stats(),
+        'logging': get_logging_stats()
+    })
 
 
 @app.route('/countries', methods=['GET'])
@@ -64,7 +109,7 @@ def get_countries():
         JSON response with list of countries including code and name
     """
     try:
-        logger.info("Fetching available countries")
+        logger.info("Fetching available countries", extra=SAMPLED)
         countries = get_available_countries()
 
         # Return countries directly for frontend compatibility
@@ -90,6 +135,9 @@ def get_data():
         countries: Comma-separated list of country codes
         start_year: Starting year (default: 1960)
         end_year: Ending year (default: 2023)
+        aggregate: Set to 'region' for per-region summaries instead of per-country series
+        weight: Set to 'population' for population-weighted region means
+        fill: Fill gaps with 'linear', 'log-linear' or 'carry-forward'; imputed years are listed per country
 
     Returns:
         JSON response with combined GDP and fertility data
@@ -99,17 +147,22 @@ def get_data():
         countries_param = request.args.get('countries')
         start_year = int(request.args.get('start_year', 1960))
         end_year = int(request.args.get('end_year', 2023))
-
-        if not countries_param:
+        aggregate, weight = parse_aggregate_params(request.args)
+        fill = parse_fill_param(request.args, aggregate)
+        available_countries = None
+
+        if not countries_param and aggregate:
+            # Region overviews cover every available country
+            available_countries = get_available_countries()
+            countries = [country['code'] for country in available_countries]
+        elif not countries_param:
             # Default to a set of major countries if none specified
-            countries = ['USA', 'CHN', 'IND', 'JPN', 'DEU', 'GBR', 'FRA', 'BRA', 'CAN', 'AUS', 
-                        'KOR', 'MEX', 'IDN', 'TUR', 'RUS', 'ITA', 'ESP', 'NLD', 'CHE', 'SWE',
-                        'NOR', 'DNK', 'FIN', 'BEL', 'AUT', 'NZL', 'SGP', 'ARE', 'ISR', 'HKG']
+            countries = list(DEFAULT_COUNTRIES)
         else:
             # Parse and validate countries
             countries = [country.strip().upper() for country in countries_param.split(',')]
 
-        valid_countries = validate_country_codes(countries)
+        valid_countries = countries if available_countries else validate_country_codes(countries)
 
         if not valid_countries:
             return jsonify({
@@ -133,10 +186,16 @@ def get_data():
                 'message': 'Years must be between 1960 and 2030'
             }), 400
 
-        logger.info(f"Fetching data for countries: {valid_countries}, years: {start_year}-{end_year}")
+        record_request_scope(g, len(valid_countries), start_year, end_year)
+        logger.info("Fetching data for %d countries, years: %d-%d", len(valid_countries), start_year, end_year,
+                    extra=SAMPLED)
 
         # Fetch the data
-        data = fetch_combined_data(valid_countries, start_year, end_year)
+        if aggregate:
+            data = fetch_region_aggregates(valid_countries, start_year, end_year, weight=weight,
+                                           available_countries=available_countries)
+        else:
+            data = fetch_combined_data(valid_countries, start_year, end_year, fill=fill)
 
         # Return data directly for frontend compatibility
         return jsonify(data)
@@ -158,94 +217,71 @@ def get_data():
         }), 500
 
 
-@app.route('/data/gdp', methods=['GET'])
-def get_gdp_data():
+@app.route('/indicators', methods=['GET'])
+def get_indicators():
     """
-    Get GDP data for specified countries and years.
-
-    Query parameters:
-        countries: Comma-separated list of country codes
-        start_year: Starting year (default: 1990)
-        end_year: Ending year (default: 2022)
+    List the registered indicators and what each costs in the serving dataset.
 
     Returns:
-        JSON response with GDP data
+        JSON response with each indicator's code, label, unit, scale and,
+        when loaded, its observation count, memory and fetch cost
     """
-    try:
-        # Parse query parameters
-        countries_param = request.args.get('countries')
-        start_year = int(request.args.get('start_year', 1990))
-        end_year = int(request.args.get('end_year', 2022))
+    return jsonify({
+        'indicators': describe_indicators(get_snapshot()),
+        'dataset_version': get_dataset_version()
+    })
 
-        if not countries_param:
-            return jsonify({
-                'success': False,
-                'error': 'Missing required parameter',
-                'message': 'countries parameter is required'
-            }), 400
-
-        # Parse and validate countries
-        countries = [country.strip().upper() for country in countries_param.split(',')]
-        valid_countries = validate_country_codes(countries)
-
-        if not valid_countries:
-            return jsonify({
-                'success': False,
-                'error': 'Invalid countries',
-                'message': 'No valid country codes provided'
-            }), 400
-
-        logger.info(f"Fetching GDP data for countries: {valid_countries}, years: {start_year}-{end_year}")
-
-        # Fetch the data
-        data = fetch_gdp_data(valid_countries, start_year, end_year)
 
-        return jsonify({
-            'success': True,
-            'data': data,
-            'data_type': 'gdp',
-            'requested_countries': countries,
-            'valid_countries': valid_countries
-        })
-
-    except Exception as e:
-        logger.error(f"Error in get_gdp_data: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': 'Failed to fetch GDP data',
-            'message': str(e)
-        }), 500
-
-
-@app.route('/data/fertility', methods=['GET'])
-def get_fertility_data():
+@app.route('/data/<indicator>', methods=['GET'])
+def get_indicator_data(indicator: str):
     """
-    Get fertility rate data for specified countries and years.
+    Get a single registered indicator for specified countries and years.
+
+    Path parameters:
+        indicator: Registered indicator name, e.g. gdp, fertility or life_expectancy
 
     Query parameters:
         countries: Comma-separated list of country codes
         start_year: Starting year (default: 1990)
         end_year: Ending year (default: 2022)
+        aggregate: Set to 'region' for per-region summaries; countries then defaults to all
+        weight: Set to 'population' for population-weighted region means
+        fill: Fill gaps with 'linear', 'log-linear' or 'carry-forward'; imputed years are listed per country
 
     Returns:
-        JSON response with fertility data
+        JSON response with the indicator data
     """
+    if indicator not in INDICATORS:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown indicator',
+            'message': f"indicator must be one of: {', '.join(INDICATORS)}"
+        }), 404
+
     try:
         # Parse query parameters
         countries_param = request.args.get('countries')
         start_year = int(request.args.get('start_year', 1990))
         end_year = int(request.args.get('end_year', 2022))
-
-        if not countries_param:
+        aggregate, weight = parse_aggregate_params(request.args)
+        fill = parse_fill_param(request.args, aggregate)
+        available_countries = None
+
+        if not countries_param and aggregate:
+            # Region overviews cover every available country
+            available_countries = get_available_countries()
+            countries = [country['code'] for country in available_countries]
+        elif not countries_param:
             return jsonify({
                 'success': False,
                 'error': 'Missing required parameter',
                 'message': 'countries parameter is required'
             }), 400
+        else:
+            # Parse and validate countries
+            countries = [country.strip().upper() for country in countries_param.split(',')]
 
-        # Parse and validate countries
-        countries = [country.strip().upper() for country in countries_param.split(',')]
-        valid_countries = validate_country_codes(countries)
+        valid_countries = countries if available_countries else validate_country_codes(countries)
 
         if not valid_countries:
             return jsonify({
@@ -254,24 +290,47 @@ def get_fertility_data():
                 'message': 'No valid country codes provided'
             }), 400
 
-        logger.info(f"Fetching fertility data for countries: {valid_countries}, years: {start_year}-{end_year}")
+        record_request_scope(g, len(valid_countries), start_year, end_year)
+        logger.info("Fetching %s data for %d countries, years: %d-%d", indicator, len(valid_countries),
+                    start_year, end_year, extra=SAMPLED)
 
         # Fetch the data
-        data = fetch_fertility_data(valid_countries, start_year, end_year)
+        if aggregate:
+            data = fetch_region_aggregates(valid_countries, start_year, end_year, indicators=(indicator,),
+                                           weight=weight, available_countries=available_countries)['regions']
+        else:
+            data = fetch_indicator_data(indicator, valid_countries, start_year, end_year)
 
-        return jsonify({
+        response = {
             'success': True,
             'data': data,
-            'data_type': 'fertility',
-            'requested_countries': countries,
-            'valid_countries': valid_countries
-        })
+            'data_type': indicator,
+            'aggregate': aggregate,
+            'fill': fill,
+            # Region membership in the data already lists the covered countries
+            'requested_countries': None if aggregate else countries,
+            'valid_countries': None if aggregate else valid_countries
+        }
+
+        if fill:
+            response['data'], response['imputed'] = fill_indicator_data(indicator, data, valid_countries,
+                                                                        start_year, end_year, fill)
+
+        return jsonify(response)
+
+    except ValueError as e:
+        logger.error(f"Value error in get_indicator_data ({indicator}): {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Invalid parameters',
+            'message': str(e)
+        }), 400
 
     except Exception as e:
-        logger.error(f"Error in get_fertility_data: {str(e)}")
+        logger.error(f"Error in get_indicator_data ({indicator}): {str(e)}")
         return jsonify({
             'success': False,
-            'error': 'Failed to fetch fertility data',
+            'error': fetch_error(indicator),
             'message': str(e)
         }), 500
 
@@ -0,0 +1,380 @@
+"""
+ASGI application serving the same API as app.py with non-blocking upstream I/O.
+
+Every route, parameter and response body matches the Flask app; only the
+execution model differs. Views are coroutines and World Bank API calls go
+through one shared AsyncWorldBankClient, so a single process can keep many
+cold requests waiting on the upstream at once instead of tying up one
+worker thread per request.
+
+Run it with an ASGI server:
+
+    GDP_VIZ_UPSTREAM=http://127.0.0.1:5050/v2 uvicorn asgi_app:app --port 5002
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from async_fetcher import AsyncWorldBankClient
+from compression import (
+    COMPRESSION_MIN_SIZE,
+    ResponseCache,
+    compress_body,
+    is_cacheable_path,
+    negotiate_encoding,
+    normalize_query
+)
+from data_fetcher import DEFAULT_COUNTRIES, fill_indicator_data
+from dataset import get_dataset_info, get_dataset_version, get_snapshot, publish_snapshot
+from indicators import INDICATORS, fetch_error
+from ingest import describe_indicators
+from query_params import parse_aggregate_params, parse_fill_param
+from refresher import DatasetRefresher
+from snapshot import load_snapshot
+from structured_logging import (
+    SAMPLED,
+    configure_logging,
+    get_logging_stats,
+    log_request,
+    record_request_scope,
+    recorded_fields
+)
+
+
+# Configure logging: JSON lines written off the event loop, hot path sampled
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Serve from a dataset snapshot file when one is configured
+SNAPSHOT_PATH = os.environ.get('GDP_VIZ_SNAPSHOT')
+
+response_cache = ResponseCache()
+
+
+class SortedJSONResponse(JSONResponse):
+    """JSON response encoded like Flask's jsonify: compact with sorted keys."""
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(content, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def error_response(error: str, message: str, status_code: int) -> SortedJSONResponse:
+    """Build the error body shared by every endpoint."""
+    return SortedJSONResponse({'success': False, 'error': error, 'message': message}, status_code=status_code)
+
+
+async def resolve_countries(request: Request, client: AsyncWorldBankClient, aggregate: Optional[str],
+                            default: Optional[List[str]]) -> Tuple[Optional[List[str]], List[str], Optional[List[Dict[str, str]]]]:
+    """
+    Work out which countries a data request covers.
+
+    Args:
+        request: Incoming request
+        client: Upstream client
+        aggregate: Parsed aggregate parameter
+        default: Countries used when none are given, or None if the parameter is required
+
+    Returns:
+        Tuple of (requested countries, valid countries, catalog); requested
+        is None when the parameter is missing and required, and the catalog
+        is only set when every available country was selected
+    """
+    countries_param = request.query_params.get('countries')
+
+    if not countries_param and aggregate:
+        # Region overviews cover every available country
+        available_countries = await client.get_available_countries()
+        countries = [country['code'] for country in available_countries]
+        return countries, countries, available_countries
+
+    if not countries_param:
+        if default is None:
+            return None, [], None
+        countries = list(default)
+    else:
+        countries = [country.strip().upper() for country in countries_param.split(',')]
+
+    return countries, await client.validate_country_codes(countries), None
+
+
+async def health_check(request: Request) -> Response:
+    """Health check endpoint."""
+    dataset_info = get_dataset_info()
+    return SortedJSONResponse({
+        'status': 'healthy',
+        'message': 'GDP Fertility Viz API is running',
+        'dataset_version': dataset_info['version'],
+        'dataset': dataset_info,
+        'response_cache': response_cache.stats(),
+        'upstream': request.app.state.client.get_stats(),
+        'logging': get_logging_stats()
+    })
+
+
+async def get_countries(request: Request) -> Response:
+    """
+    Get list of available countries.
+
+    Returns:
+        JSON response with list of countries including code and name
+    """
+    try:
+        logger.info("Fetching available countries", extra=SAMPLED)
+        countries = await request.app.state.client.get_available_countries()
+
+        # Return countries directly for frontend compatibility
+        return SortedJSONResponse({
+            'countries': countries
+        })
+
+    except Exception as e:
+        logger.error(f"Error in get_countries: {str(e)}")
+        return error_response('Failed to fetch countries', str(e), 500)
+
+
+async def get_data(request: Request) -> Response:
+    """
+    Get combined GDP and fertility data for specified countries and years.
+
+    Query parameters match the Flask /data endpoint.
+
+    Returns:
+        JSON response with combined GDP and fertility data
+    """
+    client = request.app.state.client
+    try:
+        start_year = int(request.query_params.get('start_year', 1960))
+        end_year = int(request.query_params.get('end_year', 2023))
+        aggregate, weight = parse_aggregate_params(request.query_params)
+        fill = parse_fill_param(request.query_params, aggregate)
+        _, valid_countries, available_countries = await resolve_countries(request, client, aggregate,
+                                                                          DEFAULT_COUNTRIES)
+
+        if not valid_countries:
+            return error_response('Invalid countries', 'No valid country codes provided', 400)
+
+        # Validate year range
+        if start_year > end_year:
+            return error_response('Invalid year range', 'start_year must be less than or equal to end_year', 400)
+
+        if start_year < 1960 or end_year > 2030:
+            return error_response('Invalid year range', 'Years must be between 1960 and 2030', 400)
+
+        record_request_scope(request.state, len(valid_countries), start_year, end_year)
+        logger.info("Fetching data for %d countries, years: %d-%d", len(valid_countries), start_year, end_year,
+                    extra=SAMPLED)
+
+        if aggregate:
+            data = await client.fetch_region_aggregates(valid_countries, start_year, end_year, weight=weight,
+                                                        available_countries=available_countries)
+        else:
+            data = await client.fetch_combined_data(valid_countries, start_year, end_year, fill=fill)
+
+        # Return data directly for frontend compatibility
+        return SortedJSONResponse(data)
+
+    except ValueError as e:
+        logger.error(f"Value error in get_data: {str(e)}")
+        return error_response('Invalid parameters', str(e), 400)
+
+    except Exception as e:
+        logger.error(f"Error in get_data: {str(e)}")
+        return error_response('Failed to fetch data', str(e), 500)
+
+
+async def get_indicators(request: Request) -> Response:
+    """
+    List the registered indicators and what each costs in the serving dataset.
+
+    Returns:
+        JSON response with each indicator's code, label, unit, scale and,
+        when loaded, its observation count, memory and fetch cost
+    """
+    return SortedJSONResponse({
+        'indicators': describe_indicators(get_snapshot()),
+        'dataset_version': get_dataset_version()
+    })
+
+
+async def get_indicator_data(request: Request) -> Response:
+    """
+    Get a single registered indicator for specified countries and years.
+
+    Path and query parameters match app.get_indicator_data.
+
+    Returns:
+        JSON response with the indicator data
+    """
+    indicator = request.path_params['indicator']
+    if indicator not in INDICATORS:
+        return error_response('Unknown indicator', f"indicator must be one of: {', '.join(INDICATORS)}", 404)
+
+    client = request.app.state.client
+    try:
+        start_year = int(request.query_params.get('start_year', 1990))
+        end_year = int(request.query_params.get('end_year', 2022))
+        aggregate, weight = parse_aggregate_params(request.query_params)
+        fill = parse_fill_param(request.query_params, aggregate)
+        countries, valid_countries, available_countries = await resolve_countries(request, client,
+                                                                                  aggregate, None)
+
+        if countries is None:
+            return error_response('Missing required parameter', 'countries parameter is required', 400)
+
+        if not valid_countries:
+            return error_response('Invalid countries', 'No valid country codes provided', 400)
+
+        record_request_scope(request.state, len(valid_countries), start_year, end_year)
+        logger.info("Fetching %s data for %d countries, years: %d-%d", indicator, len(valid_countries),
+                    start_year, end_year, extra=SAMPLED)
+
+        if aggregate:
+            aggregates = await client.fetch_region_aggregates(valid_countries, start_year, end_year,
+                                                              indicators=(indicator,), weight=weight,
+                                                              available_countries=available_countries)
+            data = aggregates['regions']
+        else:
+            data = await client.fetch_indicator_data(indicator, valid_countries, start_year, end_year)
+
+        response = {
+            'success': True,
+            'data': data,
+            'data_type': indicator,
+            'aggregate': aggregate,
+            'fill': fill,
+            # Region membership in the data already lists the covered countries
+            'requested_countries': None if aggregate else countries,
+            'valid_countries': None if aggregate else valid_countries
+        }
+
+        if fill:
+            response['data'], response['imputed'] = await asyncio.to_thread(
+                fill_indicator_data, indicator, data, valid_countries, start_year, end_year, fill)
+
+        return SortedJSONResponse(response)
+
+    except ValueError as e:
+        logger.error(f"Value error in get_indicator_data ({indicator}): {str(e)}")
+        return error_response('Invalid parameters', str(e), 400)
+
+    except Exception as e:
+        logger.error(f"Error in get_indicator_data ({indicator}): {str(e)}")
+        return error_response(fetch_error(indicator), str(e), 500)
+
+
+class CompressionMiddleware(BaseHTTPMiddleware):
+    """Negotiated compression and encoded-body caching, as compression.init_compression does for Flask."""
+
+    def __init__(self, app, cache: ResponseCache, min_size: int = COMPRESSION_MIN_SIZE):
+        super().__init__(app)
+        self.cache = cache
+        self.min_size = min_size
+
+    @staticmethod
+    def _finish(body: bytes, encoding: str, cache_status: str, status_code: int = 200,
+                headers: Optional[Dict[str, str]] = None) -> Response:
+        headers = dict(headers or {}, **{'Vary': 'Accept-Encoding', 'X-Cache': cache_status})
+        headers.pop('content-length', None)
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(body, status_code=status_code, headers=headers, media_type='application/json')
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        if request.method != 'GET' or not is_cacheable_path(request.url.path):
+            return await call_next(request)
+
+        encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+        key = (normalize_query(request.url.path, request.query_params), get_dataset_version(), encoding)
+        entry = self.cache.get(key)
+        if entry is not None:
+            # The view does not run, so restore what it recorded for the access record
+            for name, value in entry.access_fields.items():
+                setattr(request.state, name, value)
+            return self._finish(entry.body, entry.encoding, 'HIT')
+
+        response = await call_next(request)
+        if response.status_code != 200 or not response.headers.get('content-type', '').startswith('application/json'):
+            return response
+
+        body = b''.join([chunk async for chunk in response.body_iterator])
+        encoding = encoding if len(body) >= self.min_size else 'identity'
+        # Compressing large bodies takes milliseconds; keep it off the event loop
+        encoded = await asyncio.to_thread(compress_body, body, encoding)
+        self.cache.put(key, encoded, encoding, recorded_fields(request.state))
+
+        return self._finish(encoded, encoding, 'MISS', response.status_code, dict(response.headers))
+
+
+class RequestLogMiddleware(BaseHTTPMiddleware):
+    """One structured access record per request, as structured_logging.init_request_logging does for Flask."""
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        started = time.perf_counter()
+        response = await call_next(request)
+        log_request(request.url.path, response.status_code, time.perf_counter() - started,
+                    response.headers.get('x-cache'), recorded_fields(request.state))
+        return response
+
+
+async def not_found(request: Request, exc: HTTPException) -> Response:
+    """Handle not found errors."""
+    return SortedJSONResponse({'error': 'Not found', 'message': 'Resource not found'}, status_code=404)
+
+
+async def internal_error(request: Request, exc: Exception) -> Response:
+    """Handle internal server errors."""
+    logger.error(f"Internal server error: {str(exc)}")
+    return SortedJSONResponse({'error': 'Internal server error', 'message': 'An unexpected error occurred'},
+                              status_code=500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    """Load the snapshot, start the refresher and own the upstream client."""
+    if SNAPSHOT_PATH and os.path.exists(SNAPSHOT_PATH):
+        publish_snapshot(load_snapshot(SNAPSHOT_PATH))
+
+    refresher = None
+    if os.environ.get('GDP_VIZ_REFRESH') == '1':
+        refresher = DatasetRefresher(snapshot_path=SNAPSHOT_PATH).start()
+
+    app.state.client = AsyncWorldBankClient(endpoint=os.environ.get('GDP_VIZ_UPSTREAM'))
+    logger.info(f"Async upstream client configured for {app.state.client.endpoint}")
+    try:
+        yield
+    finally:
+        await app.state.client.aclose()
+        if refresher is not None:
+            refresher.stop()
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health_check, methods=['GET']),
+        Route('/countries', get_countries, methods=['GET']),
+        Route('/data', get_data, methods=['GET']),
+        Route('/indicators', get_indicators, methods=['GET']),
+        Route('/data/{indicator}', get_indicator_data, methods=['GET']),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=['*']),
+        Middleware(RequestLogMiddleware),
+        Middleware(CompressionMiddleware, cache=response_cache),
+    ],
+    exception_handlers={404: not_found, 500: internal_error},
+    lifespan=lifespan,
+)
@@ -0,0 +1,375 @@
+"""
+Non-blocking World Bank API client for the ASGI server.
+
+The Flask server spends most of a cold request blocked on World Bank API
+round trips, holding a worker thread for the whole time. This module offers
+the same read functions as data_fetcher as coroutines on top of one shared
+httpx.AsyncClient, so a single event loop can keep many upstream calls in
+flight. An asyncio.Semaphore bounds the number of concurrent upstream
+requests, independent series and result pages are fetched concurrently, and
+the timeout and retry policy matches upstream.py. Reads are served from the
+published snapshot first, exactly like the sync path.
+"""
+
+import asyncio
+import logging
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import wbgapi as wb
+
+from aggregation import get_cached_aggregate, store_aggregate
+from data_fetcher import (
+    build_region_aggregates,
+    combine_indicator_data,
+    read_snapshot_indicator,
+    region_aggregate_key
+)
+from dataset import get_snapshot
+from indicators import get_indicator
+from structured_logging import SAMPLED
+from upstream import (
+    RETRY_STATUSES,
+    UPSTREAM_BACKOFF_FACTOR,
+    UPSTREAM_BACKOFF_JITTER,
+    UPSTREAM_MAX_RETRIES,
+    UPSTREAM_TIMEOUT,
+    UpstreamStats
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Maximum upstream requests in flight at once, across all client requests
+ASYNC_UPSTREAM_CONCURRENCY = 32
+
+# Rows requested per page of an indicator query
+ASYNC_PAGE_SIZE = 1000
+
+# Countries per indicator query; larger selections are split and fetched concurrently
+ASYNC_COUNTRY_BATCH = 50
+
+
+class AsyncWorldBankClient:
+    """Pooled, concurrency-bounded async client for the World Bank API."""
+
+    def __init__(self, endpoint: Optional[str] = None,
+                 concurrency: int = ASYNC_UPSTREAM_CONCURRENCY,
+                 timeout: Tuple[float, float] = UPSTREAM_TIMEOUT,
+                 max_retries: int = UPSTREAM_MAX_RETRIES,
+                 backoff_factor: float = UPSTREAM_BACKOFF_FACTOR,
+                 backoff_jitter: float = UPSTREAM_BACKOFF_JITTER,
+                 page_size: int = ASYNC_PAGE_SIZE):
+        self.endpoint = (endpoint or wb.endpoint).rstrip('/')
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.page_size = page_size
+        self.stats = UpstreamStats()
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+
+    async def aclose(self) -> None:
+        """Close every pooled connection."""
+        await self._client.aclose()
+
+    async def __aenter__(self) -> 'AsyncWorldBankClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_factor * (2 ** attempt) + random.uniform(0, self.backoff_jitter)
+
+    async def _get_json(self, path: str, params: Dict[str, Any]) -> Any:
+        """
+        GET an API path, retrying connection errors, timeouts and 5xx responses.
+
+        Args:
+            path: Path below the endpoint, e.g. 'en/region'
+            params: Query string parameters
+
+        Returns:
+            Decoded JSON body
+
+        Raises:
+            httpx.HTTPError: If the request still fails after every retry
+            RuntimeError: If the API answers with an error message
+        """
+        url = f"{self.endpoint}/{path}"
+        params = dict(params, format='json')
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Only the request itself holds a slot; backoff sleeps do not
+                async with self._semaphore:
+                    self.in_flight += 1
+                    self.stats.add('requests')
+                    try:
+                        response = await self._client.get(url, params=params)
+                    finally:
+                        self.in_flight -= 1
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    self.stats.add('failures')
+                    raise
+                self.stats.add('retries')
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                self.stats.add('retries')
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.is_error:
+                self.stats.add('failures')
+                response.raise_for_status()
+
+            body = response.json()
+            if isinstance(body, list) and len(body) == 1 and 'message' in body[0]:
+                self.stats.add('failures')
+                raise RuntimeError(f"World Bank API error for {path}: {body[0]['message']}")
+            return body
+
+    async def _get_rows(self, path: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Read every page of a v2 list endpoint, fetching pages after the first concurrently."""
+        params = dict(params or {}, per_page=self.page_size)
+        meta, rows = await self._get_json(path, dict(params, page=1))
+        rows = list(rows or [])
+
+        pages = int(meta.get('pages', 1))
+        if pages > 1:
+            rest = await asyncio.gather(*(self._get_json(path, dict(params, page=page))
+                                          for page in range(2, pages + 1)))
+            for _, page_rows in rest:
+                rows.extend(page_rows or [])
+
+        return rows
+
+    async def _fetch_indicator_data(self, indicator: str, name: str, countries: List[str],
+                                    start_year: int, end_year: int, live: bool = False) -> Dict[str, Any]:
+        """
+        Fetch a single World Bank indicator for specified countries and years.
+
+        Args:
+            indicator: World Bank indicator code
+            name: Short indicator name, used as the snapshot key and in log messages
+            countries: List of country codes (ISO 3-letter codes)
+            start_year: Starting year for data collection
+            end_year: Ending year for data collection
+            live: Always call the World Bank API, bypassing the snapshot
+
+        Returns:
+            Dictionary containing indicator data organized by country and year
+        """
+        if not live:
+            data = read_snapshot_indicator(name, countries, start_year, end_year)
+            if data is not None:
+                return data
+
+        try:
+            logger.info("Fetching %s data for %d countries", name, len(countries), extra=SAMPLED)
+
+            batches = [countries[i:i + ASYNC_COUNTRY_BATCH] for i in range(0, len(countries), ASYNC_COUNTRY_BATCH)]
+            results = await asyncio.gather(*(
+                self._get_rows(f"en/country/{';'.join(batch)}/indicator/{indicator}",
+                               {'date': f'{start_year}:{end_year}'})
+                for batch in batches
+            ))
+
+            formatted_data = {}
+            for rows in results:
+                for record in rows:
+                    if record.get('value') is not None:
+                        formatted_data.setdefault(record['countryiso3code'], {})[record['date']] = float(record['value'])
+
+            # Rows arrive newest first; keep years ascending like the sync path
+            formatted_data = {code: dict(sorted(series.items())) for code, series in formatted_data.items()}
+
+            logger.info("Successfully fetched %s data for %d countries", name, len(formatted_data), extra=SAMPLED)
+            return formatted_data
+
+        except Exception as e:
+            logger.error(f"Error fetching {name} data: {str(e)}")
+            raise
+
+    async def fetch_indicator_data(self, name: str, countries: List[str], start_year: int = 1990,
+                                   end_year: int = 2022, live: bool = False) -> Dict[str, Any]:
+        """Async counterpart of data_fetcher.fetch_indicator_data."""
+        return await self._fetch_indicator_data(get_indicator(name).code, name, countries, start_year, end_year, live)
+
+    async def fetch_gdp_data(self, countries: List[str], start_year: int = 1990, end_year: int = 2022,
+                             live: bool = False) -> Dict[str, Any]:
+        """Async counterpart of data_fetcher.fetch_gdp_data."""
+        return await self.fetch_indicator_data('gdp', countries, start_year, end_year, live)
+
+    async def fetch_fertility_data(self, countries: List[str], start_year: int = 1990, end_year: int = 2022,
+                                   live: bool = False) -> Dict[str, Any]:
+        """Async counterpart of data_fetcher.fetch_fertility_data."""
+        return await self.fetch_indicator_data('fertility', countries, start_year, end_year, live)
+
+    async def fetch_population_data(self, countries: List[str], start_year: int = 1990, end_year: int = 2022,
+                                    live: bool = False) -> Dict[str, Any]:
+        """Async counterpart of data_fetcher.fetch_population_data."""
+        return await self.fetch_indicator_data('population', countries, start_year, end_year, live)
+
+    async def fetch_combined_data(self, countries: List[str], start_year: int = 1960,
+                                  end_year: int = 2023, fill: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Fetch GDP and fertility data concurrently and combine them.
+
+        Gap filling, when requested, runs on a worker thread.
+
+        Args:
+            countries: List of country codes (ISO 3-letter codes)
+            start_year: Starting year for data collection
+            end_year: Ending year for data collection
+            fill: Optional gap fill mode, one of gap_fill.FILL_MODES
+
+        Returns:
+            Dictionary containing combined data with GDP and fertility information
+        """
+        try:
+            logger.info("Fetching combined data for %d countries", len(countries), extra=SAMPLED)
+
+            gdp_data, fertility_data = await asyncio.gather(
+                self.fetch_gdp_data(countries, start_year, end_year),
+                self.fetch_fertility_data(countries, start_year, end_year),
+            )
+            if fill:
+                combined_data = await asyncio.to_thread(combine_indicator_data, countries, gdp_data,
+                                                        fertility_data, start_year, end_year, fill)
+            else:
+                combined_data = combine_indicator_data(countries, gdp_data, fertility_data, start_year, end_year)
+
+            logger.info("Successfully combined data for %d countries", len(combined_data['countries']), extra=SAMPLED)
+            return combined_data
+
+        except Exception as e:
+            logger.error(f"Error fetching combined data: {str(e)}")
+            raise
+
+    async def fetch_region_aggregates(self, countries: List[str], start_year: int = 1960, end_year: int = 2023,
+                                      indicators: tuple = ('gdp', 'fertility'), weight: Optional[str] = None,
+                                      available_countries: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        Async counterpart of data_fetcher.fetch_region_aggregates.
+
+        Results share the sync path's aggregate cache. The numpy reduction
+        runs on a worker thread so it does not stall the event loop.
+        """
+        key = region_aggregate_key(countries, start_year, end_year, indicators, weight)
+        cached = get_cached_aggregate(key)
+        if cached is not None:
+            return cached
+
+        logger.info("Aggregating %d countries by region, weight: %s", len(countries), weight, extra=SAMPLED)
+
+        try:
+            tasks = [self.fetch_indicator_data(name, countries, start_year, end_year) for name in indicators]
+            if available_countries is None:
+                tasks.append(self.get_available_countries())
+            if weight == 'population':
+                tasks.append(self.fetch_population_data(countries, start_year, end_year))
+
+            results = await asyncio.gather(*tasks)
+            series, extra = results[:len(indicators)], iter(results[len(indicators):])
+            catalog = available_countries if available_countries is not None else next(extra)
+            weights = next(extra) if weight == 'population' else None
+
+            result = await asyncio.to_thread(build_region_aggregates, countries, catalog,
+                                             dict(zip(indicators, series)), weights,
+                                             start_year, end_year, key[0])
+            store_aggregate(key, result)
+            return result
+
+        except Exception as e:
+            logger.error(f"Error aggregating data by region: {str(e)}")
+            raise
+
+    async def get_available_countries(self, live: bool = False) -> List[Dict[str, str]]:
+        """
+        Get list of available countries from World Bank API.
+
+        Returns the published snapshot's catalog when there is one.
+
+        Args:
+            live: Always call the World Bank API, bypassing the snapshot
+
+        Returns:
+            List of dictionaries containing country code, name, and region
+        """
+        snapshot = None if live else get_snapshot()
+        if snapshot is not None:
+            return snapshot['countries']
+
+        try:
+            logger.info("Fetching available countries", extra=SAMPLED)
+
+            countries = []
+            for economy in await self._get_rows('en/country/all'):
+                region = economy.get('region') or {}
+                # Skip aggregate regions (like Africa Eastern and Southern)
+                if region.get('id', 'NA') != 'NA':
+                    countries.append({
+                        'code': economy['id'],
+                        'name': economy['name'],
+                        'region': region.get('value') or region.get('id') or 'Unknown'
+                    })
+
+            logger.info("Found %d available countries", len(countries), extra=SAMPLED)
+            return countries
+
+        except Exception as e:
+            logger.error(f"Error fetching available countries: {str(e)}")
+            raise
+
+    async def validate_country_codes(self, countries: List[str]) -> List[str]:
+        """
+        Validate country codes against available countries.
+
+        Args:
+            countries: List of country codes to validate
+
+        Returns:
+            List of valid country codes
+        """
+        try:
+            available_codes = {country['code'] for country in await self.get_available_countries()}
+
+            valid_codes = [code for code in countries if code in available_codes]
+            invalid_codes = [code for code in countries if code not in available_codes]
+
+            if invalid_codes:
+                logger.warning("Invalid country codes: %s", invalid_codes)
+
+            return valid_codes
+
+        except Exception as e:
+            logger.error(f"Error validating country codes: {str(e)}")
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Report request, retry and concurrency counters.
+
+        Returns:
+            Dictionary with the endpoint, request, retry and failure counts,
+            the concurrency limit and the number of requests in flight
+        """
+        return {
+            'endpoint': self.endpoint,
+            'requests': self.stats.requests,
+            'retries': self.stats.retries,
+            'failures': self.stats.failures,
+            'concurrency_limit': self.concurrency,
+            'in_flight': self.in_flight,
+        }
@@ -0,0 +1,183 @@
+"""
+Pre-render API responses from a dataset snapshot into static files.
+
+The generated tree can be served by nginx or a CDN without running Python:
+
+    countries.json          same body as GET /countries
+    data.json               same body as the default GET /data
+    frames/<year>.json      every country's values for one year
+    manifest.json           content hashes and sizes of every file
+
+Each JSON file is written alongside precompressed .gz and .br variants, so a
+server with gzip_static/brotli_static enabled never compresses on request.
+
+Usage:
+    python build_static.py --snapshot snapshot.json --output static/
+    python build_static.py --fetch --snapshot snapshot.json --output static/
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+import brotli
+
+from data_fetcher import DEFAULT_COUNTRIES
+from snapshot import build_snapshot, load_snapshot, save_snapshot, slice_combined, year_frame
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def encode_json(payload: Any) -> bytes:
+    """
+    Serialize a response payload deterministically.
+
+    Args:
+        payload: JSON-serializable object
+
+    Returns:
+        Compact UTF-8 JSON bytes with sorted keys
+    """
+    return json.dumps(payload, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    """
+    Compress a body with every supported encoding.
+
+    Args:
+        body: Uncompressed bytes
+
+    Returns:
+        Dictionary mapping file suffix ('.gz', '.br') to compressed bytes
+    """
+    return {
+        '.gz': gzip.compress(body, compresslevel=9, mtime=0),
+        '.br': brotli.compress(body, quality=11, mode=brotli.MODE_TEXT),
+    }
+
+
+def write_atomic(path: str, body: bytes) -> None:
+    """
+    Write bytes to a file so readers never observe a partial file.
+
+    Args:
+        path: Destination file path
+        body: File contents
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_static_file(output_dir: str, name: str, payload: Any) -> Dict[str, Any]:
+    """
+    Write a JSON payload and its precompressed variants.
+
+    Args:
+        output_dir: Root of the static tree
+        name: Path of the file relative to output_dir
+        payload: JSON-serializable response body
+
+    Returns:
+        Manifest entry with content hash and sizes
+    """
+    body = encode_json(payload)
+    path = os.path.join(output_dir, name)
+    write_atomic(path, body)
+
+    encodings = {}
+    for suffix, compressed in compress_variants(body).items():
+        write_atomic(path + suffix, compressed)
+        encodings[suffix.lstrip('.')] = len(compressed)
+
+    return {
+        'sha256': hashlib.sha256(body).hexdigest(),
+        'bytes': len(body),
+        'encodings': encodings,
+    }
+
+
+def build_static_site(snapshot: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
+    """
+    Render every static response for a snapshot.
+
+    Args:
+        snapshot: Snapshot dictionary
+        output_dir: Root of the static tree
+
+    Returns:
+        The manifest that was written to manifest.json
+    """
+    available_codes = {country['code'] for country in snapshot['countries']}
+    default_countries = [code for code in DEFAULT_COUNTRIES if code in available_codes]
+    start_year = snapshot['start_year']
+    end_year = snapshot['end_year']
+
+    files = {
+        'countries.json': write_static_file(output_dir, 'countries.json', {'countries': snapshot['countries']}),
+        'data.json': write_static_file(output_dir, 'data.json',
+                                       slice_combined(snapshot, default_countries, start_year, end_year)),
+    }
+
+    for year in range(start_year, end_year + 1):
+        name = f'frames/{year}.json'
+        files[name] = write_static_file(output_dir, name, year_frame(snapshot, year))
+
+    manifest = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'snapshot_created_at': snapshot.get('created_at'),
+        'start_year': start_year,
+        'end_year': end_year,
+        'files': files,
+    }
+    # The manifest is written last so it only ever describes complete files
+    write_static_file(output_dir, 'manifest.json', manifest)
+
+    logger.info(f"Wrote {len(files)} static responses to {output_dir}")
+    return manifest
+
+
+def main(argv=None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Pre-render API responses from a dataset snapshot.')
+    parser.add_argument('--snapshot', required=True, help='Path of the dataset snapshot JSON file')
+    parser.add_argument('--output', required=True, help='Directory to write the static files to')
+    parser.add_argument('--fetch', action='store_true',
+                        help='Build the snapshot from the live World Bank API and save it first')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.fetch:
+            snapshot = build_snapshot()
+            save_snapshot(snapshot, args.snapshot)
+        else:
+            snapshot = load_snapshot(args.snapshot)
+
+        build_static_site(snapshot, args.output)
+        return 0
+
+    except Exception as e:
+        logger.error(f"Static build failed: {str(e)}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
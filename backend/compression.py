@@ -0,0 +1,187 @@
+"""
+Response compression with a cache of encoded bodies for the Flask app.
+
+Data responses are negotiated to brotli or gzip from the Accept-Encoding
+header, compressed once, and kept in a bounded LRU (dataset.VersionedCache)
+keyed by query, dataset version and encoding. Repeat requests are answered from the stored
+bytes before the view runs, so they skip the upstream fetch, JSON encoding and
+compression entirely. Bodies smaller than a threshold go out uncompressed.
+"""
+
+import gzip
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple
+
+import brotli
+from flask import Flask, g, request
+
+from dataset import DERIVED_CACHE_TTL, VersionedCache, get_dataset_version
+from structured_logging import recorded_fields
+
+
+# Bodies smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = 1024
+
+# Maximum number of encoded bodies kept in memory
+RESPONSE_CACHE_SIZE = 256
+
+# Routes whose responses are compressed and cached
+CACHEABLE_PATHS = ('/countries', '/data', '/indicators')
+
+# Route prefixes whose responses are compressed and cached (the per-indicator routes)
+CACHEABLE_PREFIXES = ('/data/',)
+
+# Supported encodings in server preference order
+ENCODINGS = ('br', 'gzip')
+
+
+class CachedBody(NamedTuple):
+    """An encoded response body ready to be sent, with the access fields its view recorded."""
+    body: bytes
+    encoding: str
+    access_fields: Dict[str, Any]
+
+
+class ResponseCache(VersionedCache):
+    """Thread-safe LRU of encoded response bodies with hit-rate counters."""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = DERIVED_CACHE_TTL):
+        super().__init__(max_size, ttl)
+
+    def put(self, key: Hashable, body: bytes, encoding: str, access_fields: Dict[str, Any]) -> None:
+        """Store an encoded body, evicting the least recently used entries."""
+        super().put(key, CachedBody(body, encoding, access_fields))
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """
+    Pick the response encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Raw header value, or None
+
+    Returns:
+        'br', 'gzip' or 'identity'
+    """
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    candidates = [name for name in ENCODINGS if accepted.get(name, accepted.get('*', 0.0)) > 0]
+    if not candidates:
+        return 'identity'
+
+    # Highest quality wins; ties go to the server preference order
+    return max(candidates, key=lambda name: (accepted.get(name, accepted.get('*', 0.0)), -ENCODINGS.index(name)))
+
+
+def is_cacheable_path(path: str) -> bool:
+    """Check whether responses for a request path are compressed and cached."""
+    return path in CACHEABLE_PATHS or path.startswith(CACHEABLE_PREFIXES)
+
+
+def normalize_query(path: str, args) -> Tuple:
+    """
+    Build a cache key component that ignores parameter order.
+
+    Parameter values are kept verbatim. In particular the countries list is
+    not sorted or deduplicated, because responses echo it back in request
+    order.
+
+    Args:
+        path: Request path
+        args: Request query arguments (MultiDict)
+
+    Returns:
+        Hashable tuple identifying the query
+    """
+    return (path, tuple((name, args.get(name)) for name in sorted(args.keys())))
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """
+    Compress a body with the given encoding.
+
+    Args:
+        body: Uncompressed bytes
+        encoding: 'br', 'gzip' or 'identity'
+
+    Returns:
+        Encoded bytes
+    """
+    if encoding == 'br':
+        return brotli.compress(body, quality=5, mode=brotli.MODE_TEXT)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def init_compression(app: Flask, min_size: int = COMPRESSION_MIN_SIZE,
+                     cache_size: int = RESPONSE_CACHE_SIZE) -> ResponseCache:
+    """
+    Enable negotiated compression and encoded-body caching on a Flask app.
+
+    Args:
+        app: Flask application
+        min_size: Bodies smaller than this are sent uncompressed
+        cache_size: Maximum number of encoded bodies to keep
+
+    Returns:
+        The response cache, also stored in app.extensions['compression']
+    """
+    cache = ResponseCache(cache_size)
+    app.extensions['compression'] = cache
+
+    def finish(response, body: bytes, encoding: str):
+        response.set_data(body)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    @app.before_request
+    def serve_cached_body():
+        if request.method != 'GET' or not is_cacheable_path(request.path):
+            return None
+
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+        key = (normalize_query(request.path, request.args), get_dataset_version(), encoding)
+        entry = cache.get(key)
+
+        if entry is None:
+            g.compression_key = key
+            return None
+
+        g.compression_hit = True
+        # The view does not run, so restore what it recorded for the access record
+        for name, value in entry.access_fields.items():
+            setattr(g, name, value)
+        response = app.response_class(mimetype='application/json')
+        response.headers['X-Cache'] = 'HIT'
+        return finish(response, entry.body, entry.encoding)
+
+    @app.after_request
+    def compress_response(response):
+        key = g.pop('compression_key', None)
+        if key is None or getattr(g, 'compression_hit', False):
+            return response
+
+        if response.status_code != 200 or response.direct_passthrough or response.mimetype != 'application/json':
+            return response
+
+        body = response.get_data()
+        encoding = key[2] if len(body) >= min_size else 'identity'
+        encoded = compress_body(body, encoding)
+        cache.put(key, encoded, encoding, recorded_fields(g))
+
+        response.headers['X-Cache'] = 'MISS'
+        return finish(response, encoded, encoding)
+
+    return cache
@@ -1,40 +1,100 @@
 """
-Data fetching module for GDP and fertility rate data from World Bank API.
+Data fetching module for World Bank indicator data.
 
-This module provides functions to fetch, process, and format GDP and fertility
-rate data using the wbgapi library for the visualization frontend.
+This module provides functions to fetch, process, and format GDP, fertility
+rate and the other indicators in the registry (see indicators.py) using the
+wbgapi library for the visualization frontend.
 """
 
 import wbgapi as wb
 import logging
-from typing import Dict, List, Optional, Any
+import os
+from typing import Dict, List, Optional, Any, Tuple
+
+from aggregation import aggregate_by_region, cached_aggregate
+from dataset import DEFAULT_COUNTRIES, get_dataset_version, get_snapshot
+from gap_fill import cached_fill, fill_series, slice_filled
+from indicators import get_indicator
+from structured_logging import SAMPLED
+from upstream import configure_upstream
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# World Bank indicator codes
-GDP_INDICATOR = "NY.GDP.PCAP.CD"  # GDP per capita (current US$)
-FERTILITY_INDICATOR = "SP.DYN.TFRT.IN"  # Fertility rate (births per woman)
+# Route every wbgapi call through the shared pooled session; GDP_VIZ_UPSTREAM
+# overrides the World Bank API base URL (e.g. a local stub for load tests)
+configure_upstream(endpoint=os.environ.get('GDP_VIZ_UPSTREAM'))
+
+# World Bank indicator codes of the built-in series
+GDP_INDICATOR = get_indicator('gdp').code
+FERTILITY_INDICATOR = get_indicator('fertility').code
+POPULATION_INDICATOR = get_indicator('population').code
+
 
+def _snapshot_covers(snapshot: Optional[Dict[str, Any]], start_year: int, end_year: int) -> bool:
+    """Check whether a published snapshot covers the requested year range."""
+    return (snapshot is not None
+            and snapshot['start_year'] <= start_year
+            and end_year <= snapshot['end_year'])
 
-def fetch_gdp_data(countries: List[str], start_year: int = 1990, end_year: int = 2022) -> Dict[str, Any]:
+
+def read_snapshot_indicator(name: str, countries: List[str], start_year: int,
+                            end_year: int) -> Optional[Dict[str, Any]]:
     """
-    Fetch GDP per capita data for specified countries and years.
+    Read an indicator from the published snapshot.
     
     Args:
+        name: Snapshot indicator name (e.g. 'gdp')
+        countries: List of country codes (ISO 3-letter codes)
+        start_year: Starting year
+        end_year: Ending year
+        
+    Returns:
+        Indicator data organized by country and year, or None when no
+        snapshot is published or it does not cover the request
+    """
+    snapshot = get_snapshot()
+    if not _snapshot_covers(snapshot, start_year, end_year) or name not in snapshot['indicators']:
+        return None
+
+    series = snapshot['indicators'][name]
+    return {
+        country: {year: value for year, value in series[country].items()
+                  if start_year <= int(year) <= end_year}
+        for country in countries if country in series
+    }
+
+
+def _fetch_indicator_data(indicator: str, name: str, countries: List[str],
+                          start_year: int, end_year: int, live: bool = False) -> Dict[str, Any]:
+    """
+    Fetch a single World Bank indicator for specified countries and years.
+    
+    Reads from the published snapshot when it holds the indicator and covers
+    the year range, otherwise calls the World Bank API.
+    
+    Args:
+        indicator: World Bank indicator code
+        name: Short indicator name, used as the snapshot key and in log messages
         countries: List of country codes (ISO 3-letter codes)
         start_year: Starting year for data collection
         end_year: Ending year for data collection
+        live: Always call the World Bank API, bypassing the snapshot
         
     Returns:
-        Dictionary containing GDP data organized by country and year
+        Dictionary containing indicator data organized by country and year
     """
+    if not live:
+        data = read_snapshot_indicator(name, countries, start_year, end_year)
+        if data is not None:
+            return data
+
     try:
-        logger.info(f"Fetching GDP data for countries: {countries}")
+        logger.info("Fetching %s data for %d countries", name, len(countries), extra=SAMPLED)
         
         data = wb.data.fetch(
-            GDP_INDICATOR,
+            indicator,
             countries,
             time=range(start_year, end_year + 1),
             skipBlanks=True
@@ -57,15 +117,54 @@ def fetch_gdp_data(countries: List[str], start_year: int = 1990, end_year: int =
                     year_num = str(year)
                 formatted_data[country_code][year_num] = float(value)
         
-        logger.info(f"Successfully fetched GDP data for {len(formatted_data)} countries")
+        logger.info("Successfully fetched %s data for %d countries", name, len(formatted_data), extra=SAMPLED)
         return formatted_data
         
     except Exception as e:
-        logger.error(f"Error fetching GDP data: {str(e)}")
+        logger.error(f"Error fetching {name} data: {str(e)}")
         raise
 
 
-def fetch_fertility_data(countries: List[str], start_year: int = 1990, end_year: int = 2022) -> Dict[str, Any]:
+def fetch_indicator_data(name: str, countries: List[str], start_year: int = 1990, end_year: int = 2022,
+                         live: bool = False) -> Dict[str, Any]:
+    """
+    Fetch any registered indicator for specified countries and years.
+    
+    Args:
+        name: Registered indicator name (e.g. 'life_expectancy')
+        countries: List of country codes (ISO 3-letter codes)
+        start_year: Starting year for data collection
+        end_year: Ending year for data collection
+        live: Always call the World Bank API, bypassing the snapshot
+        
+    Returns:
+        Dictionary containing indicator data organized by country and year
+        
+    Raises:
+        KeyError: If the indicator is not registered
+    """
+    return _fetch_indicator_data(get_indicator(name).code, name, countries, start_year, end_year, live)
+
+
+def fetch_gdp_data(countries: List[str], start_year: int = 1990, end_year: int = 2022,
+                   live: bool = False) -> Dict[str, Any]:
+    """
+    Fetch GDP per capita data for specified countries and years.
+    
+    Args:
+        countries: List of country codes (ISO 3-letter codes)
+        start_year: Starting year for data collection
+        end_year: Ending year for data collection
+        live: Always call the World Bank API, bypassing the snapshot
+        
+    Returns:
+        Dictionary containing GDP data organized by country and year
+    """
+    return fetch_indicator_data('gdp', countries, start_year, end_year, live)
+
+
+def fetch_fertility_data(countries: List[str], start_year: int = 1990, end_year: int = 2022,
+                         live: bool = False) -> Dict[str, Any]:
     """
     Fetch fertility rate data for specified countries and years.
     
@@ -73,46 +172,123 @@ def fetch_fertility_data(countries: List[str], start_year: int = 1990, end_year:
         countries: List of country codes (ISO 3-letter codes)
         start_year: Starting year for data collection
         end_year: Ending year for data collection
+        live: Always call the World Bank API, bypassing the snapshot
         
     Returns:
         Dictionary containing fertility data organized by country and year
     """
-    try:
-        logger.info(f"Fetching fertility data for countries: {countries}")
-        
-        data = wb.data.fetch(
-            FERTILITY_INDICATOR,
-            countries,
-            time=range(start_year, end_year + 1),
-            skipBlanks=True
-        )
+    return fetch_indicator_data('fertility', countries, start_year, end_year, live)
+
+
+def fetch_population_data(countries: List[str], start_year: int = 1990, end_year: int = 2022,
+                          live: bool = False) -> Dict[str, Any]:
+    """
+    Fetch total population data for specified countries and years.
+    
+    Used as the weight for population-weighted region aggregates.
+    
+    Args:
+        countries: List of country codes (ISO 3-letter codes)
+        start_year: Starting year for data collection
+        end_year: Ending year for data collection
+        live: Always call the World Bank API, bypassing the snapshot
         
-        formatted_data = {}
-        for record in data:
-            country_code = record['economy']
-            year = record['time']
-            value = record['value']
-            
-            if country_code not in formatted_data:
-                formatted_data[country_code] = {}
-            
-            if value is not None:
-                # Extract year from format like 'YR2020'
-                if year.startswith('YR'):
-                    year_num = year[2:]
-                else:
-                    year_num = str(year)
-                formatted_data[country_code][year_num] = float(value)
+    Returns:
+        Dictionary containing population data organized by country and year
+    """
+    return fetch_indicator_data('population', countries, start_year, end_year, live)
+
+
+def fill_indicator_data(name: str, data: Dict[str, Any], countries: List[str], start_year: int,
+                        end_year: int, fill: str) -> Tuple[Dict[str, Any], Dict[str, List[str]]]:
+    """
+    Fill the gaps in an indicator's series.
+    
+    When the published snapshot covers the request, the whole snapshot
+    indicator is filled once per dataset version and sliced, so gaps at the
+    edge of the requested range are filled from observations outside it.
+    Otherwise the freshly fetched data is filled as is; repeats of the same
+    request are served by the response cache.
+    
+    Args:
+        name: Registered indicator name (e.g. 'gdp'); log-scale indicators
+            are interpolated in log space under log-linear
+        data: Indicator data organized by country and year, as fetched
+        countries: List of country codes (ISO 3-letter codes)
+        start_year: Starting year
+        end_year: Ending year
+        fill: Fill mode, one of gap_fill.FILL_MODES
         
-        logger.info(f"Successfully fetched fertility data for {len(formatted_data)} countries")
-        return formatted_data
+    Returns:
+        Tuple of (dense data organized by country and year, {country: [imputed years]})
+    """
+    log_scale = get_indicator(name).scale == 'log'
+    snapshot = get_snapshot()
+    
+    if _snapshot_covers(snapshot, start_year, end_year) and name in snapshot['indicators']:
+        series = snapshot['indicators'][name]
+        filled = cached_fill(
+            (snapshot['version'], name, fill),
+            lambda: fill_series(series, list(series), snapshot['start_year'], snapshot['end_year'], fill, log_scale)
+        )
+        return slice_filled(filled, countries, start_year, end_year)
+    
+    return fill_series(data, countries, start_year, end_year, fill, log_scale)
+
+
+def combine_indicator_data(countries: List[str], gdp_data: Dict[str, Any], fertility_data: Dict[str, Any],
+                           start_year: int, end_year: int, fill: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Combine GDP and fertility series into the structure used by the visualization.
+    
+    Args:
+        countries: List of country codes (ISO 3-letter codes)
+        gdp_data: GDP data organized by country and year
+        fertility_data: Fertility data organized by country and year
+        start_year: Starting year
+        end_year: Ending year
+        fill: Optional fill mode; each country then also gets an 'imputed'
+            mapping of indicator name to the years that were filled in
         
-    except Exception as e:
-        logger.error(f"Error fetching fertility data: {str(e)}")
-        raise
+    Returns:
+        Dictionary containing combined data with GDP and fertility information
+    """
+    imputed = {}
+    if fill:
+        gdp_data, imputed['gdp'] = fill_indicator_data('gdp', gdp_data, countries, start_year, end_year, fill)
+        fertility_data, imputed['fertility'] = fill_indicator_data('fertility', fertility_data, countries,
+                                                                   start_year, end_year, fill)
+    
+    combined_data = {
+        "countries": {},
+        "years": list(range(start_year, end_year + 1)),
+        "metadata": {
+            "gdp_indicator": GDP_INDICATOR,
+            "fertility_indicator": FERTILITY_INDICATOR,
+            "start_year": start_year,
+            "end_year": end_year
+        }
+    }
+    
+    if fill:
+        combined_data["metadata"]["fill"] = fill
+    
+    for country in countries:
+        if country in gdp_data or country in fertility_data:
+            combined_data["countries"][country] = {
+                "gdp": gdp_data.get(country, {}),
+                "fertility": fertility_data.get(country, {})
+            }
+            if fill:
+                combined_data["countries"][country]["imputed"] = {
+                    name: years.get(country, []) for name, years in imputed.items()
+                }
+    
+    return combined_data
 
 
-def fetch_combined_data(countries: List[str], start_year: int = 1990, end_year: int = 2022) -> Dict[str, Any]:
+def fetch_combined_data(countries: List[str], start_year: int = 1990, end_year: int = 2022,
+                        fill: Optional[str] = None) -> Dict[str, Any]:
     """
     Fetch both GDP and fertility data for specified countries and years.
     
@@ -120,52 +296,129 @@ def fetch_combined_data(countries: List[str], start_year: int = 1990, end_year:
         countries: List of country codes (ISO 3-letter codes)
         start_year: Starting year for data collection
         end_year: Ending year for data collection
+        fill: Optional gap fill mode, one of gap_fill.FILL_MODES
         
     Returns:
         Dictionary containing combined data with GDP and fertility information
     """
     try:
-        logger.info(f"Fetching combined data for countries: {countries}")
+        logger.info("Fetching combined data for %d countries", len(countries), extra=SAMPLED)
         
         gdp_data = fetch_gdp_data(countries, start_year, end_year)
         fertility_data = fetch_fertility_data(countries, start_year, end_year)
+        combined_data = combine_indicator_data(countries, gdp_data, fertility_data, start_year, end_year, fill)
         
-        # Combine the data into a structure suitable for visualization
-        combined_data = {
-            "countries": {},
-            "years": list(range(start_year, end_year + 1)),
-            "metadata": {
-                "gdp_indicator": GDP_INDICATOR,
-                "fertility_indicator": FERTILITY_INDICATOR,
-                "start_year": start_year,
-                "end_year": end_year
-            }
+        logger.info("Successfully combined data for %d countries", len(combined_data['countries']), extra=SAMPLED)
+        return combined_data
+        
+    except Exception as e:
+        logger.error(f"Error fetching combined data: {str(e)}")
+        raise
+
+
+def region_aggregate_key(countries: List[str], start_year: int, end_year: int,
+                         indicators: tuple, weight: Optional[str]) -> tuple:
+    """Build the cache key for a region aggregate under the current dataset version."""
+    return (get_dataset_version(), tuple(sorted(countries)), start_year, end_year, tuple(indicators), weight)
+
+
+def build_region_aggregates(countries: List[str], catalog: List[Dict[str, str]],
+                            indicator_data: Dict[str, Dict[str, Any]], weights: Optional[Dict[str, Any]],
+                            start_year: int, end_year: int, dataset_version: int) -> Dict[str, Any]:
+    """
+    Aggregate fetched indicator data into the region overview response.
+    
+    Args:
+        countries: List of country codes (ISO 3-letter codes)
+        catalog: Country list as returned by get_available_countries
+        indicator_data: Mapping of indicator name to data organized by country and year
+        weights: Population data organized by country and year, or None for unweighted means
+        start_year: Starting year
+        end_year: Ending year
+        dataset_version: Dataset version the data was read from
+        
+    Returns:
+        Dictionary with per-region summaries, the years array and metadata
+    """
+    requested = set(countries)
+    regions = {c['code']: c['region'] for c in catalog if c['code'] in requested}
+    weight = 'population' if weights is not None else None
+    
+    return {
+        "regions": aggregate_by_region(indicator_data, regions, start_year, end_year, weights),
+        "years": list(range(start_year, end_year + 1)),
+        "metadata": {
+            "gdp_indicator": GDP_INDICATOR,
+            "fertility_indicator": FERTILITY_INDICATOR,
+            "population_indicator": POPULATION_INDICATOR if weight else None,
+            "start_year": start_year,
+            "end_year": end_year,
+            "aggregate": "region",
+            "weight": weight,
+            "dataset_version": dataset_version
         }
+    }
+
+
+def fetch_region_aggregates(countries: List[str], start_year: int = 1990, end_year: int = 2022,
+                            indicators: tuple = ('gdp', 'fertility'), weight: Optional[str] = None,
+                            available_countries: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+    """
+    Fetch indicator data and aggregate it into per-region, per-year summaries.
+    
+    Results are cached per dataset version for up to DERIVED_CACHE_TTL
+    seconds, so repeated overview requests skip both the upstream fetch and
+    the aggregation while live data is still picked up.
+    
+    Args:
+        countries: List of country codes (ISO 3-letter codes)
+        start_year: Starting year for data collection
+        end_year: Ending year for data collection
+        indicators: Registered indicator names to aggregate
+        weight: None for unweighted means, or 'population' for population-weighted means
+        available_countries: Country list as returned by get_available_countries,
+            used for region lookup; fetched when not provided
         
-        for country in countries:
-            if country in gdp_data or country in fertility_data:
-                combined_data["countries"][country] = {
-                    "gdp": gdp_data.get(country, {}),
-                    "fertility": fertility_data.get(country, {})
-                }
+    Returns:
+        Dictionary with per-region summaries, the years array and metadata
+    """
+    key = region_aggregate_key(countries, start_year, end_year, indicators, weight)
+
+    def compute() -> Dict[str, Any]:
+        logger.info("Aggregating %d countries by region, weight: %s", len(countries), weight, extra=SAMPLED)
         
-        logger.info(f"Successfully combined data for {len(combined_data['countries'])} countries")
-        return combined_data
+        catalog = available_countries if available_countries is not None else get_available_countries()
+        indicator_data = {name: fetch_indicator_data(name, countries, start_year, end_year) for name in indicators}
+        weights = fetch_population_data(countries, start_year, end_year) if weight == 'population' else None
+        
+        return build_region_aggregates(countries, catalog, indicator_data, weights, start_year, end_year, key[0])
+
+    try:
+        return cached_aggregate(key, compute)
         
     except Exception as e:
-        logger.error(f"Error fetching combined data: {str(e)}")
+        logger.error(f"Error fetching region aggregates: {str(e)}")
         raise
 
 
-def get_available_countries() -> List[Dict[str, str]]:
+def get_available_countries(live: bool = False) -> List[Dict[str, str]]:
     """
     Get list of available countries from World Bank API.
     
+    Returns the published snapshot's catalog when there is one.
+    
+    Args:
+        live: Always call the World Bank API, bypassing the snapshot
+    
     Returns:
         List of dictionaries containing country code, name, and region
     """
+    snapshot = None if live else get_snapshot()
+    if snapshot is not None:
+        return snapshot['countries']
+
     try:
-        logger.info("Fetching available countries")
+        logger.info("Fetching available countries", extra=SAMPLED)
         
         # First, get region mappings
         region_map = {}
@@ -190,7 +443,7 @@ def get_available_countries() -> List[Dict[str, str]]:
                     'region': region_map.get(region_code, region_code or 'Unknown')
                 })
         
-        logger.info(f"Found {len(countries)} available countries")
+        logger.info("Found %d available countries", len(countries), extra=SAMPLED)
         return countries
         
     except Exception as e:
@@ -216,7 +469,7 @@ def validate_country_codes(countries: List[str]) -> List[str]:
         invalid_codes = [code for code in countries if code not in available_codes]
         
         if invalid_codes:
-            logger.warning(f"Invalid country codes: {invalid_codes}")
+            logger.warning("Invalid country codes: %s", invalid_codes)
         
         return valid_codes
         
@@ -0,0 +1,195 @@
+"""
+Versioned serving dataset for World Bank data.
+
+The serving dataset is an immutable snapshot (see snapshot.py) published
+under a monotonically increasing version ID that is saved with it.
+Publishing swaps a single reference, so readers see either the previous
+snapshot or the new one and never a half-updated dataset. Derived results
+such as region aggregates and compressed responses are cached against the
+version; publishing or clearing a snapshot invalidates every cached view at
+once.
+
+Without a snapshot, requests read the live API and nothing changes the
+version, so derived results also expire after DERIVED_CACHE_TTL seconds to
+pick up new upstream data.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+# Seconds a derived result (aggregate, fill or encoded response body) may be
+# served before it is recomputed
+DERIVED_CACHE_TTL = 3600
+
+# Countries served by /data when no countries are requested
+DEFAULT_COUNTRIES = ['USA', 'CHN', 'IND', 'JPN', 'DEU', 'GBR', 'FRA', 'BRA', 'CAN', 'AUS',
+                     'KOR', 'MEX', 'IDN', 'TUR', 'RUS', 'ITA', 'ESP', 'NLD', 'CHE', 'SWE',
+                     'NOR', 'DNK', 'FIN', 'BEL', 'AUT', 'NZL', 'SGP', 'ARE', 'ISR', 'HKG']
+
+_version = 1
+_version_lock = threading.Lock()
+
+_snapshot: Optional[Dict[str, Any]] = None
+_published_at: Optional[float] = None
+
+
+def get_dataset_version() -> int:
+    """
+    Get the current dataset version.
+
+    Returns:
+        Monotonically increasing integer identifying the dataset in use
+    """
+    return _version
+
+
+def get_snapshot() -> Optional[Dict[str, Any]]:
+    """
+    Get the published snapshot.
+
+    Callers must treat the snapshot as read-only.
+
+    Returns:
+        The current snapshot, or None when requests go to the live API
+    """
+    return _snapshot
+
+
+def publish_snapshot(snapshot: Dict[str, Any]) -> int:
+    """
+    Atomically replace the serving snapshot under a new version.
+
+    Versions are stored with saved snapshots. A snapshot carrying a version
+    newer than the current one keeps it, so every process that loads the same
+    file serves it under the same version and a restart never moves the
+    version backwards; anything else is published under the next version.
+
+    Args:
+        snapshot: Fully built snapshot; it must not be modified afterwards
+
+    Returns:
+        The version the snapshot was published under
+    """
+    global _version, _snapshot, _published_at
+    with _version_lock:
+        stored = snapshot.get('version')
+        _version = stored if isinstance(stored, int) and stored > _version else _version + 1
+        # Readers only ever see a snapshot whose version is already set
+        _snapshot = dict(snapshot, version=_version)
+        _published_at = time.time()
+        return _version
+
+
+def clear_snapshot() -> int:
+    """
+    Stop serving from a snapshot and fall back to the live API.
+
+    Returns:
+        The new dataset version
+    """
+    global _version, _snapshot, _published_at
+    with _version_lock:
+        _version += 1
+        _snapshot = None
+        _published_at = None
+        return _version
+
+
+def get_dataset_info() -> Dict[str, Any]:
+    """
+    Describe the dataset currently being served.
+
+    Returns:
+        Dictionary with the version, whether a snapshot is published,
+        and when it was built and published
+    """
+    snapshot = _snapshot
+    return {
+        'version': _version,
+        'source': 'snapshot' if snapshot is not None else 'live',
+        'snapshot_created_at': snapshot.get('created_at') if snapshot is not None else None,
+        'published_at': _published_at,
+    }
+
+
+class VersionedCache:
+    """
+    Thread-safe LRU of derived results with a time-to-live and hit-rate counters.
+
+    Callers include the dataset version in each key, so results for an older
+    dataset are never served and simply age out of the LRU; the TTL bounds
+    how long a result computed from the live API is reused.
+    """
+
+    def __init__(self, max_size: int, ttl: float = DERIVED_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached result for key, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, result: Any) -> None:
+        """Store a result, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return a cached result, computing and storing it on a miss.
+
+        Args:
+            key: Hashable cache key including the dataset version
+            compute: Zero-argument callable producing the result
+
+        Returns:
+            The cached or freshly computed result
+        """
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def clear(self) -> None:
+        """Drop every cached result and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit-rate counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
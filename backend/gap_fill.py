@@ -0,0 +1,175 @@
+"""
+Gap filling for per-country World Bank series.
+
+The API leaves gaps where a country did not report a value, so countries
+drop out of animated charts for a few years and reappear. This module fills
+those gaps server-side, vectorized over whole country x year arrays, and
+returns a mask of which points were imputed. Fills of a published snapshot
+are cached per dataset version so each is computed once rather than on every
+request or frame.
+
+Fill modes:
+    linear         Straight-line interpolation between observations
+    log-linear     Interpolation in log space (constant growth rate) for
+                   indicators registered on a log scale, such as GDP;
+                   linear for the rest
+    carry-forward  Repeat the last observation until the next one, and
+                   after the final observation up to the latest year any
+                   country in the series reports
+
+Interpolation only fills gaps between two observations. No mode fills
+years before a country's first observation or after the last year the
+data covers.
+"""
+
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+import numpy as np
+
+from aggregation import series_to_matrix
+from dataset import VersionedCache
+
+
+# Supported values for the fill query parameter
+FILL_MODES = ('linear', 'log-linear', 'carry-forward')
+
+# Maximum number of filled series kept in memory
+FILL_CACHE_SIZE = 32
+
+_fill_cache = VersionedCache(FILL_CACHE_SIZE)
+
+
+def fill_matrix(values: np.ndarray, mode: str, log_scale: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fill the gaps in each row of a country x year array.
+
+    Args:
+        values: Country x year array with NaN for missing values
+        mode: One of FILL_MODES
+        log_scale: Interpolate in log space; rows whose neighbouring
+            observations are not both positive fall back to linear
+
+    Carry-forward does not fill columns after the last one observed in
+    any row.
+
+    Returns:
+        Tuple of (filled array, boolean mask of imputed cells)
+
+    Raises:
+        ValueError: If the mode is not supported
+    """
+    if mode not in FILL_MODES:
+        raise ValueError(f"fill must be one of: {', '.join(FILL_MODES)}")
+
+    rows, cols = values.shape
+    observed = ~np.isnan(values)
+    columns = np.broadcast_to(np.arange(cols), (rows, cols))
+
+    # Column of the nearest observation at or before / at or after each cell
+    previous = np.maximum.accumulate(np.where(observed, columns, -1), axis=1)
+    following = np.minimum.accumulate(np.where(observed, columns, cols)[:, ::-1], axis=1)[:, ::-1]
+
+    previous_value = np.take_along_axis(values, np.clip(previous, 0, cols - 1), axis=1)
+    following_value = np.take_along_axis(values, np.clip(following, 0, cols - 1), axis=1)
+
+    if mode == 'carry-forward':
+        # Years after the latest observation of any country are past the data, not gaps
+        observed_columns = np.flatnonzero(observed.any(axis=0))
+        last_observed = observed_columns[-1] if observed_columns.size else -1
+        imputed = ~observed & (previous >= 0) & (columns <= last_observed)
+        return np.where(imputed, previous_value, values), imputed
+
+    imputed = ~observed & (previous >= 0) & (following < cols)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Cells outside any gap produce NaN or inf here and are discarded
+        fraction = (columns - previous) / (following - previous)
+        filled = previous_value + fraction * (following_value - previous_value)
+
+        if mode == 'log-linear' and log_scale:
+            positive = (previous_value > 0) & (following_value > 0)
+            geometric = np.exp(np.log(previous_value) + fraction * (np.log(following_value) - np.log(previous_value)))
+            filled = np.where(positive, geometric, filled)
+
+    return np.where(imputed, filled, values), imputed
+
+
+def fill_series(series: Dict[str, Dict[str, float]], codes: List[str], start_year: int, end_year: int,
+                mode: str, log_scale: bool = False) -> Tuple[Dict[str, Dict[str, float]], Dict[str, List[str]]]:
+    """
+    Fill the gaps in a {country: {year: value}} series.
+
+    Args:
+        series: Indicator values organized by country and year
+        codes: Countries to fill; countries without any observation are omitted
+        start_year: First year of the output range
+        end_year: Last year of the output range
+        mode: One of FILL_MODES
+        log_scale: Interpolate in log space under log-linear
+
+    Returns:
+        Tuple of (dense series, {country: [imputed years]}); countries with
+        no imputed years are left out of the second mapping
+    """
+    codes = [code for code in codes if series.get(code)]
+    years = [str(year) for year in range(start_year, end_year + 1)]
+    if not codes:
+        return {}, {}
+
+    filled, imputed = fill_matrix(series_to_matrix(series, codes, years), mode, log_scale)
+    present = ~np.isnan(filled)
+
+    dense = {
+        code: {years[col]: float(filled[row, col]) for col in np.flatnonzero(present[row])}
+        for row, code in enumerate(codes)
+    }
+    mask = {
+        code: [years[col] for col in np.flatnonzero(imputed[row])]
+        for row, code in enumerate(codes) if imputed[row].any()
+    }
+    return dense, mask
+
+
+def slice_filled(filled: Tuple[Dict[str, Dict[str, float]], Dict[str, List[str]]], countries: List[str],
+                 start_year: int, end_year: int) -> Tuple[Dict[str, Dict[str, float]], Dict[str, List[str]]]:
+    """
+    Restrict a fill_series result to some countries and years.
+
+    Args:
+        filled: (dense series, imputed years) as returned by fill_series
+        countries: Country codes to keep
+        start_year: First year to keep
+        end_year: Last year to keep
+
+    Returns:
+        Tuple of (dense series, {country: [imputed years]}) for the selection
+    """
+    dense, mask = filled
+
+    def in_range(year: str) -> bool:
+        return start_year <= int(year) <= end_year
+
+    sliced = {code: {year: value for year, value in dense[code].items() if in_range(year)}
+              for code in countries if code in dense}
+    sliced_mask = {code: [year for year in mask[code] if in_range(year)] for code in countries if code in mask}
+    return ({code: values for code, values in sliced.items() if values},
+            {code: years for code, years in sliced_mask.items() if years})
+
+
+def cached_fill(key: Hashable, compute: Callable[[], Any]) -> Any:
+    """
+    Return a cached fill result, computing and storing it on a miss.
+
+    Args:
+        key: Hashable cache key including the dataset version
+        compute: Zero-argument callable producing the result
+
+    Returns:
+        The cached or freshly computed result
+    """
+    return _fill_cache.get_or_compute(key, compute)
+
+
+def clear_fill_cache() -> None:
+    """Drop every cached fill result."""
+    _fill_cache.clear()
@@ -0,0 +1,140 @@
+"""
+Registry of the World Bank indicators the API can serve.
+
+Each indicator is registered once under a short name with its World Bank
+series code, a label, a unit and the scale it is plotted and interpolated
+on. Everything else is driven from the registry: the generic /data/<name>
+routes, snapshot building and bulk ingestion, the refresh schedule and gap
+filling, so adding a series is one register_indicator call (or one entry in
+the file named by GDP_VIZ_INDICATORS) rather than a new fetcher and route.
+
+Environment:
+    GDP_VIZ_INDICATORS  Optional JSON file with a list of extra indicators,
+                        each an object with name, code, label, unit and scale
+"""
+
+import json
+import logging
+import os
+import re
+from typing import Dict, List, NamedTuple
+
+
+logger = logging.getLogger(__name__)
+
+# Scales an indicator can be plotted and interpolated on
+SCALES = ('linear', 'log')
+
+# Indicator names double as URL path segments and snapshot keys
+_NAME_PATTERN = re.compile(r'^[a-z][a-z0-9_]*$')
+
+
+class Indicator(NamedTuple):
+    """A World Bank series registered for serving."""
+    name: str
+    code: str
+    label: str
+    unit: str
+    scale: str
+
+
+INDICATORS: Dict[str, Indicator] = {}
+
+# Names used in fetch errors where they differ from the indicator name; the
+# GDP route reported 'Failed to fetch GDP data' before the registry existed
+_ERROR_NAMES = {'gdp': 'GDP'}
+
+
+def register_indicator(name: str, code: str, label: str, unit: str, scale: str = 'linear') -> Indicator:
+    """
+    Register an indicator, replacing any earlier registration under the same name.
+
+    Args:
+        name: Short name used in routes and snapshots (e.g. 'life_expectancy')
+        code: World Bank indicator code (e.g. 'SP.DYN.LE00.IN')
+        label: Human-readable name
+        unit: Unit of the values
+        scale: 'log' for series that grow geometrically, otherwise 'linear'
+
+    Returns:
+        The registered indicator
+
+    Raises:
+        ValueError: If the name or scale is invalid
+    """
+    if not _NAME_PATTERN.match(name):
+        raise ValueError(f"Invalid indicator name: {name!r}")
+    if scale not in SCALES:
+        raise ValueError(f"scale must be one of: {', '.join(SCALES)}")
+
+    indicator = Indicator(name, code, label, unit, scale)
+    INDICATORS[name] = indicator
+    return indicator
+
+
+def get_indicator(name: str) -> Indicator:
+    """
+    Look up a registered indicator.
+
+    Args:
+        name: Short indicator name
+
+    Returns:
+        The registered indicator
+
+    Raises:
+        KeyError: If no indicator is registered under the name
+    """
+    return INDICATORS[name]
+
+
+def fetch_error(name: str) -> str:
+    """
+    Build the error string reported when fetching an indicator fails.
+
+    Args:
+        name: Short indicator name
+
+    Returns:
+        Error string such as 'Failed to fetch fertility data'
+    """
+    return f"Failed to fetch {_ERROR_NAMES.get(name, name)} data"
+
+
+def list_indicators() -> List[Indicator]:
+    """Return every registered indicator in registration order."""
+    return list(INDICATORS.values())
+
+
+def load_indicators(path: str) -> List[Indicator]:
+    """
+    Register the indicators listed in a JSON file.
+
+    Args:
+        path: File holding a list of {name, code, label, unit, scale} objects
+
+    Returns:
+        The indicators registered from the file
+
+    Raises:
+        ValueError: If an entry is missing a field or has an invalid value
+    """
+    with open(path) as f:
+        entries = json.load(f)
+
+    try:
+        return [register_indicator(entry['name'], entry['code'], entry['label'], entry['unit'],
+                                   entry.get('scale', 'linear'))
+                for entry in entries]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid indicator entry in {path}: {e}")
+
+
+register_indicator('gdp', 'NY.GDP.PCAP.CD', 'GDP per capita', 'current US$', 'log')
+register_indicator('fertility', 'SP.DYN.TFRT.IN', 'Fertility rate', 'births per woman')
+register_indicator('population', 'SP.POP.TOTL', 'Population', 'people', 'log')
+register_indicator('life_expectancy', 'SP.DYN.LE00.IN', 'Life expectancy at birth', 'years')
+
+if os.environ.get('GDP_VIZ_INDICATORS'):
+    load_indicators(os.environ['GDP_VIZ_INDICATORS'])
+    logger.info("Registered %d indicators", len(INDICATORS))
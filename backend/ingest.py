@@ -0,0 +1,166 @@
+"""
+Bulk ingestion of registered indicators from the World Bank API.
+
+Fetching indicators one after another costs one sequential round trip per
+series and country page, so every added series makes snapshot builds and
+refreshes slower. Ingestion instead splits the country list into batches and
+fetches every (indicator, batch) pair in one pass on a thread pool sized to
+the pooled upstream session, so many series load in roughly the time of the
+slowest batch. Each ingested indicator reports what it costs to keep: its
+observation count, approximate memory footprint and the upstream time spent
+fetching it, which /indicators exposes per series.
+"""
+
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from data_fetcher import fetch_indicator_data
+from indicators import get_indicator, list_indicators
+from upstream import UPSTREAM_POOL_SIZE
+
+
+logger = logging.getLogger(__name__)
+
+# Parallel upstream queries; more than the pooled session holds would just queue
+INGEST_WORKERS = UPSTREAM_POOL_SIZE
+
+# Countries per upstream query during ingestion
+INGEST_COUNTRY_BATCH = 50
+
+
+def series_memory(series: Dict[str, Dict[str, float]]) -> int:
+    """
+    Approximate the bytes held by a {country: {year: value}} series.
+
+    Objects shared between countries, such as year keys decoded from one
+    JSON document, are counted once.
+
+    Args:
+        series: Indicator data organized by country and year
+
+    Returns:
+        Size in bytes of the containers, keys and values
+    """
+    seen = set()
+    total = 0
+
+    def add(obj: Any) -> None:
+        nonlocal total
+        if id(obj) not in seen:
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+
+    add(series)
+    for code, values in series.items():
+        add(code)
+        add(values)
+        for year, value in values.items():
+            add(year)
+            add(value)
+
+    return total
+
+
+def series_stats(series: Dict[str, Dict[str, float]]) -> Dict[str, int]:
+    """
+    Summarize the size of an indicator series.
+
+    Args:
+        series: Indicator data organized by country and year
+
+    Returns:
+        Dictionary with country and observation counts and approximate memory in bytes
+    """
+    return {
+        'countries': sum(1 for values in series.values() if values),
+        'observations': sum(len(values) for values in series.values()),
+        'memory_bytes': series_memory(series),
+    }
+
+
+def ingest_indicators(names: List[str], countries: List[str], start_year: int, end_year: int,
+                      workers: int = INGEST_WORKERS,
+                      batch_size: int = INGEST_COUNTRY_BATCH) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Fetch several registered indicators from the live API in one parallel pass.
+
+    Args:
+        names: Registered indicator names
+        countries: List of country codes (ISO 3-letter codes)
+        start_year: Starting year for data collection
+        end_year: Ending year for data collection
+        workers: Upstream queries run at once
+        batch_size: Countries per upstream query
+
+    Returns:
+        Tuple of ({name: data organized by country and year}, {name: stats});
+        stats hold the series_stats fields plus the number of batches and the
+        upstream seconds spent on them, summed over batches
+
+    Raises:
+        KeyError: If an indicator is not registered
+    """
+    for name in names:
+        get_indicator(name)
+
+    batches = [countries[i:i + batch_size] for i in range(0, len(countries), batch_size)]
+    tasks = [(name, batch) for name in names for batch in batches]
+
+    def fetch(task: Tuple[str, List[str]]) -> Tuple[Dict[str, Any], float]:
+        name, batch = task
+        started = time.perf_counter()
+        series = fetch_indicator_data(name, batch, start_year, end_year, live=True)
+        return series, time.perf_counter() - started
+
+    started = time.perf_counter()
+    logger.info("Ingesting %d indicators for %d countries in %d batches", len(names), len(countries), len(tasks))
+
+    # map returns results in task order, so country order is the same on every run
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tasks))), thread_name_prefix='ingest') as pool:
+        results = list(pool.map(fetch, tasks))
+
+    data = {name: {} for name in names}
+    seconds = dict.fromkeys(names, 0.0)
+    for (name, _), (series, elapsed) in zip(tasks, results):
+        data[name].update(series)
+        seconds[name] += elapsed
+
+    stats = {
+        name: dict(series_stats(data[name]), batches=len(batches), fetch_seconds=round(seconds[name], 3))
+        for name in names
+    }
+
+    logger.info("Ingested %d indicators in %.1fs", len(names), time.perf_counter() - started)
+    return data, stats
+
+
+def describe_indicators(snapshot: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Describe every registered indicator and what it costs in the serving dataset.
+
+    Stats recorded at ingestion are used when the snapshot has them; for
+    series loaded from an older snapshot file the size is measured instead
+    and the fetch cost is unknown.
+
+    Args:
+        snapshot: The published snapshot, or None when serving from the live API
+
+    Returns:
+        One dictionary per indicator with its registry fields, whether it is
+        loaded, and its stats (None when not loaded)
+    """
+    loaded = snapshot['indicators'] if snapshot is not None else {}
+    recorded = snapshot.get('indicator_stats', {}) if snapshot is not None else {}
+
+    described = []
+    for indicator in list_indicators():
+        stats = None
+        if indicator.name in loaded:
+            stats = recorded.get(indicator.name) or dict(series_stats(loaded[indicator.name]),
+                                                         batches=None, fetch_seconds=None)
+        described.append(dict(indicator._asdict(), loaded=indicator.name in loaded, stats=stats))
+
+    return described
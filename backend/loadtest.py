@@ -0,0 +1,431 @@
+"""
+Local load-testing harness for the API servers.
+
+Each server configuration is started as a subprocess against a local World
+Bank API stub with configurable latency, so a run needs no network access and
+can be repeated on a single Linux box. Concurrency is ramped level by level;
+at each level a closed loop of clients replays a weighted request mix and the
+harness records throughput, latency percentiles (overall and per request
+kind), error rates and the server's CPU time per request. The highest level
+whose p95 latency stays within the SLO without errors is reported as the
+sustained concurrency of each configuration.
+
+Request mixes:
+    realistic  /countries, default /data, custom-range /data and
+               single-indicator calls in production-like proportions
+    data       custom-range /data only; every request is a cache miss
+
+Server configurations are the product of --modes (sync: Flask app under
+gunicorn; async: ASGI app under uvicorn) and --workers.
+
+Usage:
+    python loadtest.py
+    python loadtest.py --modes sync --workers 1,2,4 --threads 8
+    python loadtest.py --mix data --latency 0.2 --levels 8,16,32,64 --duration 10 --json report.json
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+# Not from data_fetcher: importing it configures logging and the upstream
+# client, which would log every harness request
+from dataset import DEFAULT_COUNTRIES
+
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds of delay the stub adds to every upstream response, close to the
+# real API's typical response time
+LOADTEST_STUB_LATENCY = 0.3
+
+# Concurrent clients at each step of the ramp
+LOADTEST_LEVELS = (4, 8, 16, 32, 64, 128)
+
+# Seconds of light load before the ramp so start-up costs are not measured
+LOADTEST_WARMUP = 2.0
+
+# Seconds spent at each concurrency level
+LOADTEST_DURATION = 5.0
+
+# p95 latency in seconds a level must stay within to count as sustained
+LOADTEST_SLO = 2.0
+
+# Worker threads per sync server process (gunicorn gthread)
+SYNC_THREADS = 8
+
+# Seconds to wait for a server to answer /health after starting
+STARTUP_TIMEOUT = 30.0
+
+# Client-side timeout in seconds for each request
+REQUEST_TIMEOUT = 30.0
+
+# Kernel clock ticks per second, the unit of CPU times in /proc
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+
+def free_port() -> int:
+    """Pick an unused local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(mode: str, port: int, workers: int = 1, threads: int = SYNC_THREADS) -> List[str]:
+    """
+    Build the command line that serves the API in the given mode.
+
+    Args:
+        mode: 'sync' for the Flask app under gunicorn, 'async' for the ASGI app under uvicorn
+        port: Port to listen on
+        workers: Server processes
+        threads: Worker threads per sync server process
+
+    Returns:
+        Argument list for subprocess
+    """
+    if mode == 'sync':
+        return [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+                '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app']
+    if mode == 'async':
+        return [sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--host', '127.0.0.1', '--port', str(port),
+                '--workers', str(workers), '--log-level', 'warning', '--no-access-log']
+    raise ValueError(f"Unknown server mode: {mode}")
+
+
+def process_tree_cpu(pid: int) -> float:
+    """
+    CPU seconds (user + system) used so far by a process and all its descendants.
+
+    Args:
+        pid: Root process ID
+
+    Returns:
+        Total CPU seconds; processes that exit while being read are skipped
+    """
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/stat') as f:
+                # Fields after the parenthesised command name; utime and stime are 14 and 15
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += int(fields[11]) + int(fields[12])
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total / CLOCK_TICKS
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = STARTUP_TIMEOUT) -> None:
+    """
+    Poll a URL until it answers 200.
+
+    Raises:
+        RuntimeError: If the process exits or the URL does not answer in time
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited with status {process.returncode} before {url} was ready")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+@contextmanager
+def running(command: List[str], ready_url: str, env: Optional[Dict[str, str]] = None) -> Iterator[subprocess.Popen]:
+    """Run a subprocess from the backend directory until the block exits."""
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=dict(os.environ, **(env or {})),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(ready_url, process)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def countries_path(rng: random.Random) -> str:
+    """The country list, as loaded by every page view."""
+    return '/countries'
+
+
+def default_data_path(rng: random.Random) -> str:
+    """The default /data view: default countries, full year range."""
+    return '/data'
+
+
+def random_data_path(rng: random.Random) -> str:
+    """A /data query with a random country subset and year range."""
+    countries = rng.sample(DEFAULT_COUNTRIES, rng.randint(3, 12))
+    start_year = rng.randint(1960, 2015)
+    end_year = rng.randint(start_year, 2023)
+    return f"/data?countries={','.join(countries)}&start_year={start_year}&end_year={end_year}"
+
+
+def indicator_path(rng: random.Random) -> str:
+    """A single-indicator query for a few random countries over the default years."""
+    indicator = rng.choice(('gdp', 'fertility'))
+    countries = rng.sample(DEFAULT_COUNTRIES, rng.randint(1, 5))
+    return f"/data/{indicator}?countries={','.join(countries)}"
+
+
+# Weighted request kinds: (name, weight, path builder)
+REQUEST_MIXES = {
+    'realistic': (
+        ('countries', 0.15, countries_path),
+        ('default_data', 0.30, default_data_path),
+        ('custom_data', 0.35, random_data_path),
+        ('indicator', 0.20, indicator_path),
+    ),
+    'data': (
+        ('custom_data', 1.0, random_data_path),
+    ),
+}
+
+
+def mix_picker(mix: Tuple) -> Callable[[random.Random], Tuple[str, str]]:
+    """
+    Build a function drawing (kind, path) pairs from a weighted request mix.
+
+    Args:
+        mix: Sequence of (name, weight, path builder)
+
+    Returns:
+        Function taking a random generator and returning a request kind and path
+    """
+    cumulative = list(itertools.accumulate(weight for _, weight, _ in mix))
+
+    def pick(rng: random.Random) -> Tuple[str, str]:
+        name, _, build = mix[bisect.bisect(cumulative, rng.random() * cumulative[-1])]
+        return name, build(rng)
+
+    return pick
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of numbers; 0.0 when empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Request counts, error rate, throughput and latency percentiles for one set of requests."""
+    total = len(latencies) + errors
+    return {
+        'requests': total,
+        'errors': errors,
+        'error_rate': errors / total if total else 0.0,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+    }
+
+
+async def run_level(base_url: str, concurrency: int, duration: float,
+                    pick: Callable[[random.Random], Tuple[str, str]], seed: int = 0,
+                    server_pid: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Drive a closed loop of clients against a server for a fixed time.
+
+    Args:
+        base_url: Server base URL
+        concurrency: Number of clients, each with one request outstanding
+        duration: Seconds to keep sending new requests
+        pick: Draws a (kind, path) pair from a random generator
+        seed: Seed for the request mix
+        server_pid: Server process to measure CPU time for, if any
+
+    Returns:
+        Dictionary with the overall summary, the concurrency, CPU
+        milliseconds per request and a summary per request kind
+    """
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=REQUEST_TIMEOUT) as client:
+        cpu_start = process_tree_cpu(server_pid) if server_pid else 0.0
+        started = time.monotonic()
+        deadline = started + duration
+
+        async def worker(index: int) -> None:
+            rng = random.Random(seed * 100003 + index)
+            while time.monotonic() < deadline:
+                kind, path = pick(rng)
+                sent = time.monotonic()
+                try:
+                    response = await client.get(path)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.setdefault(kind, []).append(time.monotonic() - sent)
+                else:
+                    errors[kind] = errors.get(kind, 0) + 1
+
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+        elapsed = time.monotonic() - started
+        cpu = process_tree_cpu(server_pid) - cpu_start if server_pid else 0.0
+
+    kinds = sorted(set(latencies) | set(errors))
+    result = summarize([value for kind in kinds for value in latencies.get(kind, [])],
+                       sum(errors.values()), elapsed)
+    result['concurrency'] = concurrency
+    result['cpu_ms_per_request'] = 1000 * cpu / result['requests'] if result['requests'] else 0.0
+    result['endpoints'] = {kind: summarize(latencies.get(kind, []), errors.get(kind, 0), elapsed) for kind in kinds}
+    return result
+
+
+def sustained_concurrency(results: List[Dict[str, Any]], slo: float) -> int:
+    """Highest level, reached without a failing level below it, that met the SLO with no errors."""
+    sustained = 0
+    for result in results:
+        if result['errors'] or result['p95'] > slo:
+            break
+        sustained = result['concurrency']
+    return sustained
+
+
+def format_level(result: Dict[str, Any]) -> str:
+    """One report line for a concurrency level, followed by one line per request kind."""
+    lines = [f"  c={result['concurrency']:<4d} {result['throughput']:7.1f} req/s  p50={result['p50']:.3f}s  "
+             f"p95={result['p95']:.3f}s  p99={result['p99']:.3f}s  errors={result['error_rate']:.1%}  "
+             f"cpu={result['cpu_ms_per_request']:.1f}ms/req"]
+    for kind, summary in result['endpoints'].items():
+        lines.append(f"      {kind:<13s} {summary['requests']:6d} req  p50={summary['p50']:.3f}s  "
+                     f"p95={summary['p95']:.3f}s  errors={summary['error_rate']:.1%}")
+    return '\n'.join(lines)
+
+
+def ramp(base_url: str, levels: List[int], duration: float, slo: float, mix: Tuple,
+         server_pid: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Run every concurrency level in turn, stopping once the SLO is clearly broken."""
+    pick = mix_picker(mix)
+    asyncio.run(run_level(base_url, 2, LOADTEST_WARMUP, pick, seed=-1))
+
+    results = []
+    for level in levels:
+        result = asyncio.run(run_level(base_url, level, duration, pick, seed=level, server_pid=server_pid))
+        results.append(result)
+        print(format_level(result))
+        if result['p95'] > 2 * slo or result['error_rate'] > 0.5:
+            break
+    return results
+
+
+def run_loadtest(modes: List[str], workers: List[int] = (1,), latency: float = LOADTEST_STUB_LATENCY,
+                 levels=LOADTEST_LEVELS, duration: float = LOADTEST_DURATION, slo: float = LOADTEST_SLO,
+                 threads: int = SYNC_THREADS, mix: str = 'realistic') -> Dict[str, Any]:
+    """
+    Start the stub and each server configuration in turn and ramp load against it.
+
+    Args:
+        modes: Server modes to test, 'sync' and/or 'async'
+        workers: Server process counts to test for each mode
+        latency: Seconds of stub latency per upstream response
+        levels: Concurrency levels to ramp through
+        duration: Seconds per level
+        slo: p95 latency SLO in seconds
+        threads: Worker threads per sync server process
+        mix: Name of the request mix in REQUEST_MIXES
+
+    Returns:
+        Dictionary with the settings and, per configuration, every level's
+        results, the peak throughput and the sustained concurrency
+
+    Raises:
+        ValueError: If a mode or mix name is unknown
+    """
+    if mix not in REQUEST_MIXES:
+        raise ValueError(f"Unknown request mix: {mix}")
+
+    stub_port = free_port()
+    stub_command = [sys.executable, 'stub_worldbank.py', '--port', str(stub_port), '--latency', str(latency)]
+    stub_endpoint = f'http://127.0.0.1:{stub_port}/v2'
+    report = {'latency': latency, 'duration': duration, 'slo': slo, 'sync_threads': threads,
+              'mix': mix, 'configurations': {}}
+
+    with running(stub_command, f'{stub_endpoint}/en/region?format=json'):
+        for mode, count in itertools.product(modes, workers):
+            name = f'{mode}-w{count}'
+            port = free_port()
+            base_url = f'http://127.0.0.1:{port}'
+            print(f"{name} server:")
+            with running(server_command(mode, port, count, threads), f'{base_url}/health',
+                         env={'GDP_VIZ_UPSTREAM': stub_endpoint}) as server:
+                results = ramp(base_url, list(levels), duration, slo, REQUEST_MIXES[mix], server.pid)
+            report['configurations'][name] = {
+                'mode': mode,
+                'workers': count,
+                'levels': results,
+                'peak_throughput': max(result['throughput'] for result in results),
+                'sustained_concurrency': sustained_concurrency(results, slo),
+            }
+
+    return report
+
+
+def main(argv=None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Load test the API servers against a local stub World Bank API.')
+    parser.add_argument('--modes', default='sync,async', help='Comma-separated server modes to test')
+    parser.add_argument('--workers', default='1', help='Comma-separated server process counts to test')
+    parser.add_argument('--threads', type=int, default=SYNC_THREADS, help='Worker threads per sync server process')
+    parser.add_argument('--mix', default='realistic', choices=sorted(REQUEST_MIXES), help='Request mix to replay')
+    parser.add_argument('--latency', type=float, default=LOADTEST_STUB_LATENCY, help='Stub latency per upstream call in seconds')
+    parser.add_argument('--levels', default=','.join(map(str, LOADTEST_LEVELS)), help='Comma-separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=LOADTEST_DURATION, help='Seconds per concurrency level')
+    parser.add_argument('--slo', type=float, default=LOADTEST_SLO, help='p95 latency SLO in seconds')
+    parser.add_argument('--json', help='Also write the full report to this file')
+    args = parser.parse_args(argv)
+
+    try:
+        report = run_loadtest(args.modes.split(','), [int(count) for count in args.workers.split(',')],
+                              args.latency, [int(level) for level in args.levels.split(',')],
+                              args.duration, args.slo, args.threads, args.mix)
+    except (RuntimeError, ValueError) as e:
+        print(f"Load test failed: {e}", file=sys.stderr)
+        return 1
+
+    print(f"\nSummary ({args.mix} mix, p95 SLO {args.slo}s, stub latency {args.latency}s):")
+    for name, result in report['configurations'].items():
+        print(f"  {name:<10s} peak {result['peak_throughput']:7.1f} req/s  "
+              f"sustained concurrency {result['sustained_concurrency']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
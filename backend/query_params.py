@@ -0,0 +1,70 @@
+"""
+Query parameter parsing shared by the Flask and ASGI applications.
+
+Both servers accept the same optional aggregate, weight and fill parameters
+on the data routes. The parsers here take the query mapping itself (a Flask
+request.args or a Starlette request.query_params), so the two apps validate
+and report errors identically.
+"""
+
+from typing import Mapping, Optional, Tuple
+
+from gap_fill import FILL_MODES
+
+
+# Supported values for the aggregate and weight query parameters
+AGGREGATE_MODES = ('region',)
+WEIGHT_MODES = ('population',)
+
+
+def parse_aggregate_params(args: Mapping[str, str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Parse the optional aggregate and weight query parameters.
+
+    Args:
+        args: Request query arguments
+
+    Returns:
+        Tuple of (aggregate, weight), each None when not requested
+
+    Raises:
+        ValueError: If either parameter has an unsupported value
+    """
+    aggregate = args.get('aggregate')
+    weight = args.get('weight')
+
+    if aggregate is not None and aggregate not in AGGREGATE_MODES:
+        raise ValueError(f"aggregate must be one of: {', '.join(AGGREGATE_MODES)}")
+
+    if weight is not None:
+        if weight not in WEIGHT_MODES:
+            raise ValueError(f"weight must be one of: {', '.join(WEIGHT_MODES)}")
+        if aggregate is None:
+            raise ValueError("weight requires aggregate=region")
+
+    return aggregate, weight
+
+
+def parse_fill_param(args: Mapping[str, str], aggregate: Optional[str]) -> Optional[str]:
+    """
+    Parse the optional fill query parameter.
+
+    Args:
+        args: Request query arguments
+        aggregate: Parsed aggregate parameter; filling applies to per-country series only
+
+    Returns:
+        The fill mode, or None when not requested
+
+    Raises:
+        ValueError: If the mode is unsupported or combined with aggregate
+    """
+    fill = args.get('fill')
+
+    if fill is not None:
+        if fill not in FILL_MODES:
+            raise ValueError(f"fill must be one of: {', '.join(FILL_MODES)}")
+        if aggregate is not None:
+            raise ValueError("fill cannot be combined with aggregate")
+
+    return fill
@@ -0,0 +1,278 @@
+"""
+Scheduled background refresh of the serving dataset.
+
+The refresher owns keeping the served World Bank data current. It refreshes
+the country catalog and each registered indicator on its own interval, with
+random jitter so multiple instances do not hit the API in lockstep. Every
+refresh builds a new snapshot off to the side from the live API and then
+publishes it atomically under a new dataset version, so requests keep being
+served from the previous snapshot and never wait on a refresh.
+
+Run it inside the Flask process by setting GDP_VIZ_REFRESH=1, or on its own
+to keep a snapshot file current for build_static.py and app start-up:
+
+    python refresher.py --snapshot snapshot.json
+    python refresher.py --snapshot snapshot.json --once
+    python refresher.py --snapshot snapshot.json --ingest life_expectancy,population
+
+--ingest bulk-loads the named indicators into an existing snapshot file
+without rebuilding the rest of it.
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from data_fetcher import get_available_countries
+from dataset import get_snapshot, publish_snapshot
+from indicators import list_indicators
+from snapshot import build_snapshot, load_snapshot, save_snapshot, with_indicators
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds between refreshes of each job
+CATALOG_REFRESH_INTERVAL = 24 * 3600
+INDICATOR_REFRESH_INTERVAL = 6 * 3600
+
+# Seconds before a failed refresh is retried
+REFRESH_RETRY_INTERVAL = 300
+
+# Each interval is randomly stretched or shrunk by up to this fraction
+REFRESH_JITTER = 0.1
+
+CATALOG_JOB = 'catalog'
+
+
+def snapshot_age(snapshot: Dict) -> float:
+    """Seconds since a snapshot was built, or 0 when its created_at is missing or unreadable."""
+    try:
+        created_at = datetime.fromisoformat(snapshot['created_at'])
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return max((datetime.now(timezone.utc) - created_at).total_seconds(), 0.0)
+
+
+def default_intervals() -> Dict[str, float]:
+    """Refresh interval in seconds for the catalog and every registered indicator."""
+    intervals = {CATALOG_JOB: CATALOG_REFRESH_INTERVAL}
+    intervals.update({indicator.name: INDICATOR_REFRESH_INTERVAL for indicator in list_indicators()})
+    return intervals
+
+
+class DatasetRefresher:
+    """Refreshes and atomically republishes the serving snapshot on a schedule."""
+
+    def __init__(self, intervals: Optional[Dict[str, float]] = None, jitter: float = REFRESH_JITTER,
+                 retry_interval: float = REFRESH_RETRY_INTERVAL, snapshot_path: Optional[str] = None):
+        self.intervals = intervals or default_intervals()
+        self.jitter = jitter
+        self.retry_interval = retry_interval
+        self.snapshot_path = snapshot_path
+        self.next_run: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _jittered(self, interval: float) -> float:
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _publish(self, snapshot: Dict) -> int:
+        version = publish_snapshot(snapshot)
+        if self.snapshot_path:
+            save_snapshot(get_snapshot(), self.snapshot_path)
+        return version
+
+    def refresh_all(self) -> int:
+        """
+        Build a complete snapshot from the live API and publish it.
+
+        Returns:
+            The published dataset version
+        """
+        version = self._publish(build_snapshot())
+        logger.info(f"Published full snapshot as dataset version {version}")
+        return version
+
+    def refresh(self, job: str) -> int:
+        """
+        Refresh one part of the snapshot and publish the result.
+
+        The current snapshot is never modified; a new one is assembled from
+        it and the freshly fetched part, then swapped in.
+
+        Args:
+            job: 'catalog' or a registered indicator name
+
+        Returns:
+            The published dataset version
+        """
+        if job != CATALOG_JOB:
+            return self.ingest([job])
+
+        current = get_snapshot()
+        if current is None:
+            return self.refresh_all()
+
+        start = time.monotonic()
+        snapshot = dict(current, countries=get_available_countries(live=True))
+        snapshot['created_at'] = datetime.now(timezone.utc).isoformat()
+
+        old_codes = {country['code'] for country in current['countries']}
+        if any(country['code'] not in old_codes for country in snapshot['countries']):
+            # New countries have no series yet; refresh indicators next
+            for indicator in list_indicators():
+                self.next_run[indicator.name] = time.monotonic()
+
+        version = self._publish(snapshot)
+        logger.info(f"Refreshed {job} in {time.monotonic() - start:.1f}s, dataset version {version}")
+        return version
+
+    def ingest(self, names: List[str]) -> int:
+        """
+        Bulk-load indicators into the serving snapshot and publish the result.
+
+        All named indicators are fetched in one ingestion pass and published
+        together, so the dataset version changes once however many are due.
+
+        Args:
+            names: Registered indicator names
+
+        Returns:
+            The published dataset version
+        """
+        current = get_snapshot()
+        if current is None:
+            return self.refresh_all()
+
+        start = time.monotonic()
+        version = self._publish(with_indicators(current, names))
+        logger.info(f"Ingested {', '.join(names)} in {time.monotonic() - start:.1f}s, dataset version {version}")
+        return version
+
+    def _due(self, job: str) -> bool:
+        return job in self.intervals and self.next_run.get(job, 0) <= time.monotonic()
+
+    def _reschedule(self, jobs: List[str], failed: bool) -> None:
+        for job in jobs:
+            self.next_run[job] = time.monotonic() + self._jittered(
+                self.retry_interval if failed else self.intervals[job])
+
+    def run_pending(self) -> None:
+        """
+        Run every job that is due, rescheduling each with jitter.
+
+        The catalog runs first, since new countries make every indicator
+        due. All due indicators are then refreshed in one ingestion pass and
+        one publish.
+        """
+        if self._due(CATALOG_JOB) and not self._stop.is_set():
+            try:
+                self.refresh(CATALOG_JOB)
+                self._reschedule([CATALOG_JOB], failed=False)
+            except Exception as e:
+                logger.error(f"Error refreshing {CATALOG_JOB}: {str(e)}")
+                self._reschedule([CATALOG_JOB], failed=True)
+
+        due = [job for job in self.intervals if job != CATALOG_JOB and self._due(job)]
+        if due and not self._stop.is_set():
+            try:
+                self.ingest(due)
+                self._reschedule(due, failed=False)
+            except Exception as e:
+                logger.error(f"Error refreshing {', '.join(due)}: {str(e)}")
+                self._reschedule(due, failed=True)
+
+    def schedule_initial_runs(self) -> None:
+        """
+        Schedule the first run of each job that has not been scheduled yet.
+
+        With a snapshot, each job first runs one jittered interval after
+        the snapshot was built, so a stale snapshot file loaded at start-up
+        is refreshed right away. Without one, jobs retry after the retry
+        interval.
+        """
+        now = time.monotonic()
+        snapshot = get_snapshot()
+        age = snapshot_age(snapshot) if snapshot is not None else 0.0
+
+        for job, interval in self.intervals.items():
+            if snapshot is None:
+                self.next_run.setdefault(job, now + self._jittered(self.retry_interval))
+            else:
+                self.next_run.setdefault(job, now + max(self._jittered(interval) - age, 0.0))
+
+    def _run(self) -> None:
+        if get_snapshot() is None:
+            try:
+                self.refresh_all()
+            except Exception as e:
+                logger.error(f"Error building initial snapshot: {str(e)}")
+
+        self.schedule_initial_runs()
+
+        while not self._stop.is_set():
+            self.run_pending()
+            wait = min(self.next_run.values()) - time.monotonic()
+            self._stop.wait(max(wait, 0))
+
+    def start(self) -> 'DatasetRefresher':
+        """Run the schedule on a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name='dataset-refresher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the schedule after the job in progress finishes."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_forever(self) -> None:
+        """Run the schedule on the calling thread."""
+        self._run()
+
+
+def main(argv=None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Keep a dataset snapshot file current.')
+    parser.add_argument('--snapshot', required=True, help='Path of the dataset snapshot JSON file to write')
+    parser.add_argument('--once', action='store_true', help='Build and write one snapshot, then exit')
+    parser.add_argument('--ingest', help='Comma-separated indicator names to load into the snapshot, then exit')
+    args = parser.parse_args(argv)
+
+    refresher = DatasetRefresher(snapshot_path=args.snapshot)
+    try:
+        # Start from the existing file so only what is due gets refetched
+        if os.path.exists(args.snapshot):
+            try:
+                publish_snapshot(load_snapshot(args.snapshot))
+            except ValueError as e:
+                logger.warning(f"Ignoring existing snapshot: {str(e)}")
+
+        if args.ingest:
+            refresher.ingest([name.strip() for name in args.ingest.split(',') if name.strip()])
+        elif args.once:
+            refresher.refresh_all()
+        else:
+            refresher.run_forever()
+        return 0
+
+    except KeyboardInterrupt:
+        return 0
+
+    except Exception as e:
+        logger.error(f"Refresh failed: {str(e)}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Dataset snapshots of World Bank data for offline serving.
+
+A snapshot holds the country catalog plus every registered indicator series
+for every available country over the full year range, in one JSON document,
+along with each series' ingestion stats. Snapshots are built from the live
+API by bulk ingestion, written to disk, and sliced into the same response
+shapes the Flask endpoints produce.
+"""
+
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from data_fetcher import FERTILITY_INDICATOR, GDP_INDICATOR, get_available_countries
+from indicators import list_indicators
+from ingest import ingest_indicators
+
+
+logger = logging.getLogger(__name__)
+
+# Version of the on-disk snapshot layout
+SNAPSHOT_FORMAT = 1
+
+# Year range covered by a snapshot, matching the /data endpoint limits
+SNAPSHOT_START_YEAR = 1960
+SNAPSHOT_END_YEAR = 2023
+
+
+def build_snapshot(start_year: int = SNAPSHOT_START_YEAR, end_year: int = SNAPSHOT_END_YEAR) -> Dict[str, Any]:
+    """
+    Build a snapshot of every available country from the live World Bank API.
+
+    Every registered indicator is fetched in one bulk ingestion pass.
+
+    Args:
+        start_year: First year to include
+        end_year: Last year to include
+
+    Returns:
+        Snapshot dictionary with catalog, indicator series and metadata
+    """
+    logger.info(f"Building snapshot for years {start_year}-{end_year}")
+
+    countries = get_available_countries(live=True)
+    codes = [country['code'] for country in countries]
+    indicators, stats = ingest_indicators([indicator.name for indicator in list_indicators()],
+                                          codes, start_year, end_year)
+
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "start_year": start_year,
+        "end_year": end_year,
+        "countries": countries,
+        "indicators": indicators,
+        "indicator_stats": stats
+    }
+
+
+def with_indicators(snapshot: Dict[str, Any], names: List[str]) -> Dict[str, Any]:
+    """
+    Copy a snapshot with some indicators freshly ingested from the live API.
+
+    The given snapshot is not modified; indicators that are not named are
+    shared with it.
+
+    Args:
+        snapshot: Snapshot dictionary
+        names: Registered indicator names to fetch for the snapshot's countries and years
+
+    Returns:
+        New snapshot dictionary
+    """
+    codes = [country['code'] for country in snapshot['countries']]
+    indicators, stats = ingest_indicators(names, codes, snapshot['start_year'], snapshot['end_year'])
+
+    return dict(
+        snapshot,
+        created_at=datetime.now(timezone.utc).isoformat(),
+        indicators=dict(snapshot['indicators'], **indicators),
+        indicator_stats=dict(snapshot.get('indicator_stats', {}), **stats)
+    )
+
+
+def save_snapshot(snapshot: Dict[str, Any], path: str) -> None:
+    """
+    Write a snapshot to disk atomically.
+
+    Args:
+        snapshot: Snapshot dictionary
+        path: Destination file path
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_snapshot(path: str) -> Dict[str, Any]:
+    """
+    Read a snapshot from disk.
+
+    Args:
+        path: Snapshot file path
+
+    Returns:
+        Snapshot dictionary
+
+    Raises:
+        ValueError: If the file is not a snapshot in a supported format
+    """
+    with open(path) as f:
+        snapshot = json.load(f)
+
+    if not isinstance(snapshot, dict) or snapshot.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format in {path}")
+
+    return snapshot
+
+
+def slice_combined(snapshot: Dict[str, Any], countries: List[str], start_year: int, end_year: int) -> Dict[str, Any]:
+    """
+    Extract combined GDP and fertility data from a snapshot.
+
+    The result has the same shape as data_fetcher.fetch_combined_data.
+
+    Args:
+        snapshot: Snapshot dictionary
+        countries: List of country codes (ISO 3-letter codes)
+        start_year: Starting year
+        end_year: Ending year
+
+    Returns:
+        Dictionary containing combined data with GDP and fertility information
+    """
+    gdp_data = snapshot['indicators']['gdp']
+    fertility_data = snapshot['indicators']['fertility']
+
+    def in_range(series: Dict[str, float]) -> Dict[str, float]:
+        return {year: value for year, value in series.items() if start_year <= int(year) <= end_year}
+
+    combined_data = {
+        "countries": {},
+        "years": list(range(start_year, end_year + 1)),
+        "metadata": {
+            "gdp_indicator": GDP_INDICATOR,
+            "fertility_indicator": FERTILITY_INDICATOR,
+            "start_year": start_year,
+            "end_year": end_year
+        }
+    }
+
+    for country in countries:
+        if country in gdp_data or country in fertility_data:
+            combined_data["countries"][country] = {
+                "gdp": in_range(gdp_data.get(country, {})),
+                "fertility": in_range(fertility_data.get(country, {}))
+            }
+
+    return combined_data
+
+
+def year_frame(snapshot: Dict[str, Any], year: int) -> Dict[str, Any]:
+    """
+    Extract every country's values for a single year from a snapshot.
+
+    Args:
+        snapshot: Snapshot dictionary
+        year: Year to extract
+
+    Returns:
+        Dictionary with the year and a {country: {gdp, fertility}} mapping
+        for countries that have at least one value in that year
+    """
+    key = str(year)
+    frame = {}
+
+    for country in snapshot['countries']:
+        code = country['code']
+        gdp = snapshot['indicators']['gdp'].get(code, {}).get(key)
+        fertility = snapshot['indicators']['fertility'].get(code, {}).get(key)
+        if gdp is not None or fertility is not None:
+            frame[code] = {"gdp": gdp, "fertility": fertility}
+
+    return {"year": year, "countries": frame}
@@ -0,0 +1,298 @@
+"""
+Low-overhead structured logging for the API servers.
+
+Request threads never format or write log lines. Records go through a
+QueueHandler onto a bounded in-memory queue and a QueueListener thread
+formats them as one JSON object per line and writes them out, so request
+latency does not depend on log I/O; when the queue is full new records are
+dropped and counted rather than blocking. Messages use lazy %-style
+arguments, which are only rendered by the listener.
+
+Hot-path records (per-request INFO lines) are marked with ``extra=SAMPLED``
+and kept at a configurable rate; everything else, including all warnings
+and errors, is always kept. Each request produces one access record with
+its route, status, duration, cache status, and the country count and year
+span the view resolved; records for non-2xx responses are never sampled.
+
+Environment:
+    GDP_VIZ_LOG_LEVEL        Root log level (default INFO)
+    GDP_VIZ_LOG_SAMPLE_RATE  Fraction of hot-path records kept (default 0.1)
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import TYPE_CHECKING, Any, Dict, Optional, TextIO
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+
+# Fraction of hot-path records kept
+LOG_SAMPLE_RATE = float(os.environ.get('GDP_VIZ_LOG_SAMPLE_RATE', 0.1))
+
+# Root log level
+LOG_LEVEL = os.environ.get('GDP_VIZ_LOG_LEVEL', 'INFO')
+
+# Records buffered between request threads and the writer thread
+LOG_QUEUE_SIZE = 10000
+
+# Pass as extra= to mark a record as hot-path and subject to sampling
+SAMPLED = {'sampled': True}
+
+# Request attributes data views set on flask.g or request.state for the access record
+ACCESS_FIELDS = ('country_count', 'year_span')
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName', 'sampled'}
+
+access_logger = logging.getLogger('access')
+
+
+class LogStats:
+    """Thread-safe counters for records queued and dropped by sampling or a full queue."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.dropped = 0
+        self.sampled_out = 0
+
+    def add(self, name: str, amount: int = 1) -> None:
+        """Increment a counter by name."""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def reset(self) -> None:
+        """Zero every counter."""
+        with self._lock:
+            self.queued = self.dropped = self.sampled_out = 0
+
+
+stats = LogStats()
+
+
+class SamplingFilter(logging.Filter):
+    """Keep hot-path records at a fixed rate and every other record."""
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, 'sampled', False) or record.levelno >= logging.WARNING:
+            return True
+        if self.rate >= 1 or random.random() < self.rate:
+            return True
+        stats.add('sampled_out')
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that defers formatting to the listener and drops records when full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The base class renders the message here, on the request thread;
+        # the listener's formatter does it instead
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            stats.add('queued')
+        except queue.Full:
+            stats.add('dropped')
+
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as a single-line JSON object including its extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_queue: Optional[queue.Queue] = None
+_listener: Optional[QueueListener] = None
+_sampling_filter: Optional[SamplingFilter] = None
+
+
+def configure_logging(level: str = LOG_LEVEL, sample_rate: float = LOG_SAMPLE_RATE,
+                      stream: Optional[TextIO] = None, queue_size: int = LOG_QUEUE_SIZE) -> QueueListener:
+    """
+    Route all logging through the non-blocking queue and JSON writer thread.
+
+    Replaces any handlers already on the root logger, so it is safe to call
+    after logging.basicConfig and to call again with new settings.
+
+    Args:
+        level: Root log level name
+        sample_rate: Fraction of hot-path records kept
+        stream: Destination for log lines (default: stderr)
+        queue_size: Maximum records buffered before new ones are dropped
+
+    Returns:
+        The started listener
+    """
+    global _queue, _listener, _sampling_filter
+
+    shutdown_logging()
+
+    _queue = queue.Queue(queue_size)
+    _sampling_filter = SamplingFilter(sample_rate)
+
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(JsonFormatter())
+
+    handler = NonBlockingQueueHandler(_queue)
+    handler.addFilter(_sampling_filter)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    stats.reset()
+    _listener = QueueListener(_queue, writer, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def flush_logging() -> None:
+    """Block until every queued record has been written."""
+    if _queue is not None:
+        _queue.join()
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except queue.Full:
+            pass
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    """
+    Report queue and sampling counters.
+
+    Returns:
+        Dictionary with the sample rate, records queued, records dropped
+        because the queue was full and hot-path records sampled out
+    """
+    return {
+        'sample_rate': _sampling_filter.rate if _sampling_filter else None,
+        'queued': stats.queued,
+        'dropped': stats.dropped,
+        'sampled_out': stats.sampled_out,
+        'backlog': _queue.qsize() if _queue is not None else 0,
+    }
+
+
+def record_request_scope(target, country_count: int, start_year: int, end_year: int) -> None:
+    """
+    Record the countries and years a data view resolved, for its access record.
+
+    Args:
+        target: flask.g or a Starlette request.state
+        country_count: Number of valid countries the request covers
+        start_year: Resolved first year
+        end_year: Resolved last year
+    """
+    target.country_count = country_count
+    target.year_span = end_year - start_year + 1
+
+
+def recorded_fields(source) -> Dict[str, Any]:
+    """
+    Collect the access fields a view recorded for the current request.
+
+    Args:
+        source: flask.g or a Starlette request.state
+
+    Returns:
+        Dictionary with whichever ACCESS_FIELDS were set
+    """
+    return {name: getattr(source, name) for name in ACCESS_FIELDS if hasattr(source, name)}
+
+
+def request_fields(route: str, status: int, duration: float, cache: Optional[str],
+                   recorded: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the structured fields of an access record.
+
+    Args:
+        route: Request path
+        status: Response status code
+        duration: Seconds spent handling the request
+        cache: Response cache status ('HIT', 'MISS') or None
+        recorded: Fields the view recorded (see recorded_fields); missing ones are logged as null
+
+    Returns:
+        Dictionary of JSON-serializable fields
+    """
+    fields = {
+        'route': route,
+        'status': status,
+        'duration_ms': round(duration * 1000, 2),
+        'cache': cache,
+    }
+    fields.update({name: recorded.get(name) for name in ACCESS_FIELDS})
+    return fields
+
+
+def log_request(route: str, status: int, duration: float, cache: Optional[str],
+                recorded: Dict[str, Any]) -> None:
+    """Emit the access record for a finished request; only successful requests are sampled."""
+    if access_logger.isEnabledFor(logging.INFO):
+        fields = request_fields(route, status, duration, cache, recorded)
+        access_logger.info('%s %s', route, status, extra=dict(SAMPLED, **fields) if 200 <= status < 300 else fields)
+
+
+def init_request_logging(app: 'Flask') -> None:
+    """
+    Emit one structured access record per request on a Flask app.
+
+    Call before init_compression so the record sees the X-Cache status and
+    the timer starts before a cached response short-circuits the request.
+
+    Args:
+        app: Flask application
+    """
+    # Imported here so the ASGI server can log without depending on Flask
+    from flask import g, request
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_access(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            log_request(request.path, response.status_code, time.perf_counter() - started,
+                        response.headers.get('X-Cache'), recorded_fields(g))
+        return response
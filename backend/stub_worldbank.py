@@ -0,0 +1,333 @@
+"""
+Local stub of the World Bank API for offline tests and load testing.
+
+The stub answers every endpoint wbgapi touches when this project fetches
+indicators, economies and regions, plus the country/indicator endpoint used
+by the async client, using deterministic synthetic data. It can
+add latency to each response and fail a number of requests with a 5xx status,
+so the upstream client's pooling, retries and timeouts can be exercised
+without network access.
+
+Usage:
+    python stub_worldbank.py --port 5050 --latency 0.2
+
+then point wbgapi at it with upstream.configure_upstream(endpoint='http://127.0.0.1:5050/v2').
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+# (code, iso2, name, region code); covers dataset.DEFAULT_COUNTRIES
+STUB_COUNTRIES = [
+    ('USA', 'US', 'United States', 'NAC'), ('CAN', 'CA', 'Canada', 'NAC'),
+    ('CHN', 'CN', 'China', 'EAS'), ('JPN', 'JP', 'Japan', 'EAS'), ('KOR', 'KR', 'Korea, Rep.', 'EAS'),
+    ('IDN', 'ID', 'Indonesia', 'EAS'), ('AUS', 'AU', 'Australia', 'EAS'), ('NZL', 'NZ', 'New Zealand', 'EAS'),
+    ('SGP', 'SG', 'Singapore', 'EAS'), ('HKG', 'HK', 'Hong Kong SAR, China', 'EAS'),
+    ('IND', 'IN', 'India', 'SAS'), ('PAK', 'PK', 'Pakistan', 'SAS'), ('BGD', 'BD', 'Bangladesh', 'SAS'),
+    ('DEU', 'DE', 'Germany', 'ECS'), ('GBR', 'GB', 'United Kingdom', 'ECS'), ('FRA', 'FR', 'France', 'ECS'),
+    ('ITA', 'IT', 'Italy', 'ECS'), ('ESP', 'ES', 'Spain', 'ECS'), ('NLD', 'NL', 'Netherlands', 'ECS'),
+    ('CHE', 'CH', 'Switzerland', 'ECS'), ('SWE', 'SE', 'Sweden', 'ECS'), ('NOR', 'NO', 'Norway', 'ECS'),
+    ('DNK', 'DK', 'Denmark', 'ECS'), ('FIN', 'FI', 'Finland', 'ECS'), ('BEL', 'BE', 'Belgium', 'ECS'),
+    ('AUT', 'AT', 'Austria', 'ECS'), ('RUS', 'RU', 'Russian Federation', 'ECS'), ('TUR', 'TR', 'Turkiye', 'ECS'),
+    ('BRA', 'BR', 'Brazil', 'LCN'), ('MEX', 'MX', 'Mexico', 'LCN'), ('ARG', 'AR', 'Argentina', 'LCN'),
+    ('ARE', 'AE', 'United Arab Emirates', 'MEA'), ('ISR', 'IL', 'Israel', 'MEA'), ('EGY', 'EG', 'Egypt, Arab Rep.', 'MEA'),
+    ('NGA', 'NG', 'Nigeria', 'SSF'), ('KEN', 'KE', 'Kenya', 'SSF'), ('ETH', 'ET', 'Ethiopia', 'SSF'),
+]
+
+STUB_REGIONS = {
+    'EAS': ('Z4', 'East Asia & Pacific'),
+    'ECS': ('Z7', 'Europe & Central Asia'),
+    'LCN': ('ZJ', 'Latin America & Caribbean'),
+    'MEA': ('ZQ', 'Middle East & North Africa'),
+    'NAC': ('XU', 'North America'),
+    'SAS': ('8S', 'South Asia'),
+    'SSF': ('ZG', 'Sub-Saharan Africa'),
+}
+
+STUB_YEARS = range(1960, 2024)
+
+
+def stub_value(series: str, country: str, year: int) -> Optional[float]:
+    """
+    Deterministic synthetic observation for a series, country and year.
+
+    Early years are blank for some countries so callers see gaps like the
+    real API returns.
+
+    Args:
+        series: Indicator code
+        country: ISO 3-letter country code
+        year: Observation year
+
+    Returns:
+        The value, or None for a blank observation
+    """
+    seed = zlib.crc32(f'{series}:{country}'.encode())
+    if year < 1960 + seed % 15:
+        return None
+
+    t = year - 1960
+    if series == 'SP.DYN.TFRT.IN':
+        return round(1.2 + (seed % 50) / 10 * (0.985 ** t), 3)
+    if series == 'SP.DYN.LE00.IN':
+        return round(45 + seed % 25 + 0.25 * t, 2)
+    if series == 'SP.POP.TOTL':
+        return float((seed % 900 + 1) * 100000 * (1.015 ** t))
+    return round((seed % 4000 + 100) * (1.04 ** t), 2)
+
+
+class _QuietServer(ThreadingHTTPServer):
+    """Threaded server that ignores clients hanging up mid-response."""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+class StubWorldBank:
+    """Threaded HTTP server emulating the World Bank API endpoints used by wbgapi."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 fail_requests: int = 0, fail_status: int = 503):
+        self.latency = latency
+        self.fail_requests = fail_requests
+        self.fail_status = fail_status
+        self.requests_served = 0
+        self.connections_opened = 0
+        self._lock = threading.Lock()
+        self._server = _QuietServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def endpoint(self) -> str:
+        """Base URL to assign to wbgapi.endpoint."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v2'
+
+    def start(self) -> 'StubWorldBank':
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Shut the server down."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        """Serve requests on the calling thread."""
+        self._server.serve_forever()
+
+    def __enter__(self) -> 'StubWorldBank':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _next_request_fails(self) -> bool:
+        with self._lock:
+            self.requests_served += 1
+            if self.fail_requests > 0:
+                self.fail_requests -= 1
+                return True
+            return False
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections_opened += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                if stub._next_request_fails():
+                    self._send(stub.fail_status, {'error': 'stub failure'})
+                    return
+
+                url = urlsplit(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                body = route(url.path, params)
+                if body is None:
+                    self._send(404, [{'message': [{'id': '120', 'key': 'Invalid value', 'value': url.path}]}])
+                else:
+                    self._send(200, body)
+
+            def _send(self, status: int, payload: Any) -> None:
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def _page(rows: List[Any], params: Dict[str, str]) -> Dict[str, Any]:
+    per_page = int(params.get('per_page', 50))
+    page = int(params.get('page', 1))
+    return {
+        'page': page,
+        'pages': max(1, -(-len(rows) // per_page)),
+        'per_page': per_page,
+        'total': len(rows),
+        'rows': rows[(page - 1) * per_page:page * per_page],
+    }
+
+
+def _v2_list(rows: List[Dict[str, Any]], params: Dict[str, str]) -> List[Any]:
+    paged = _page(rows, params)
+    rows = paged.pop('rows')
+    return [paged, rows]
+
+
+def _variables(rows: List[Dict[str, Any]], params: Dict[str, str]) -> Dict[str, Any]:
+    paged = _page(rows, params)
+    rows = paged.pop('rows')
+    paged['source'] = [{'id': '2', 'name': 'World Development Indicators', 'concept': [{'id': 'stub', 'variable': rows}]}]
+    return paged
+
+
+def _selected(ids: str, available: List[str]) -> List[str]:
+    return available if ids == 'all' else [i for i in ids.split(';') if i in available]
+
+
+def route(path: str, params: Dict[str, str]) -> Optional[Any]:
+    """
+    Build the response body for an API path.
+
+    Args:
+        path: URL path, e.g. /v2/en/region
+        params: Query string parameters
+
+    Returns:
+        JSON-serializable body, or None if the path is not emulated
+    """
+    match = re.match(r'^/v2/[a-z]{2}/(.*)$', path)
+    if not match:
+        return None
+    resource = match.group(1).rstrip('/')
+
+    codes = [c[0] for c in STUB_COUNTRIES]
+    names = {c[0]: c[2] for c in STUB_COUNTRIES}
+    names['WLD'] = 'World'
+
+    if resource in ('region', 'region/all'):
+        rows = [{'id': '', 'code': code, 'iso2code': iso2, 'name': name} for code, (iso2, name) in STUB_REGIONS.items()]
+        return _v2_list(rows, params)
+
+    if resource == 'incomelevel':
+        return _v2_list([{'id': 'HIC', 'iso2code': 'XD', 'value': 'High income'}], params)
+
+    if resource == 'lendingtype':
+        return _v2_list([{'id': 'LNX', 'iso2code': 'XX', 'value': 'Not classified'}], params)
+
+    if resource == 'country/all':
+        rows = [{
+            'id': code, 'iso2Code': iso2, 'name': name,
+            'region': {'id': region, 'iso2code': STUB_REGIONS[region][0], 'value': STUB_REGIONS[region][1]},
+            'adminregion': {'id': '', 'iso2code': '', 'value': ''},
+            'incomeLevel': {'id': 'HIC', 'iso2code': 'XD', 'value': 'High income'},
+            'lendingType': {'id': 'LNX', 'iso2code': 'XX', 'value': 'Not classified'},
+            'capitalCity': '', 'longitude': '', 'latitude': '',
+        } for code, iso2, name, region in STUB_COUNTRIES]
+        rows.append({
+            'id': 'WLD', 'iso2Code': '1W', 'name': 'World',
+            'region': {'id': 'NA', 'iso2code': 'NA', 'value': 'Aggregates'},
+            'adminregion': {'id': '', 'iso2code': '', 'value': ''},
+            'incomeLevel': {'id': 'NA', 'iso2code': 'NA', 'value': 'Aggregates'},
+            'lendingType': {'id': '', 'iso2code': '', 'value': 'Aggregates'},
+            'capitalCity': '', 'longitude': '', 'latitude': '',
+        })
+        return _v2_list(rows, params)
+
+    if resource == 'sources/2/concepts':
+        concepts = [{'id': name, 'value': name} for name in ('Country', 'Series', 'Time')]
+        body = _page(concepts, params)
+        body.pop('rows')
+        body['source'] = [{'id': '2', 'name': 'World Development Indicators', 'concept': concepts}]
+        return body
+
+    match = re.match(r'^sources/2/time/(.+)$', resource)
+    if match:
+        years = [f'YR{year}' for year in STUB_YEARS]
+        rows = [{'id': key, 'value': key[2:]} for key in _selected(match.group(1), years)]
+        return _variables(rows, params)
+
+    match = re.match(r'^sources/2/country/(.+)$', resource)
+    if match:
+        rows = [{'id': code, 'value': names[code]} for code in _selected(match.group(1), codes + ['WLD'])]
+        return _variables(rows, params)
+
+    match = re.match(r'^sources/2/series/([^/]+)/country/([^/]+)/time/([^/]+)$', resource)
+    if match:
+        series_ids = match.group(1).split(';')
+        countries = _selected(match.group(2), codes)
+        years = [int(key[2:]) for key in _selected(match.group(3), [f'YR{year}' for year in STUB_YEARS])]
+        rows = [{
+            'variable': [
+                {'concept': 'Country', 'id': country, 'value': names[country]},
+                {'concept': 'Series', 'id': series, 'value': series},
+                {'concept': 'Time', 'id': f'YR{year}', 'value': str(year)},
+            ],
+            'value': stub_value(series, country, year),
+        } for series in series_ids for country in countries for year in years]
+        paged = _page(rows, params)
+        paged['source'] = {'id': '2', 'name': 'World Development Indicators', 'data': paged.pop('rows')}
+        return paged
+
+    match = re.match(r'^country/([^/]+)/indicator/([^/]+)$', resource)
+    if match:
+        countries = _selected(match.group(1).upper(), codes)
+        first, _, last = params.get('date', f'{STUB_YEARS[0]}:{STUB_YEARS[-1]}').partition(':')
+        years = range(int(first), int(last or first) + 1)
+        iso2 = {c[0]: c[1] for c in STUB_COUNTRIES}
+        # Newest year first, as the real API orders indicator rows
+        rows = [{
+            'indicator': {'id': match.group(2), 'value': match.group(2)},
+            'country': {'id': iso2[country], 'value': names[country]},
+            'countryiso3code': country,
+            'date': str(year),
+            'value': stub_value(match.group(2), country, year),
+            'unit': '', 'obs_status': '', 'decimal': 0,
+        } for country in countries for year in reversed(years) if year in STUB_YEARS]
+        return _v2_list(rows, params)
+
+    return None
+
+
+def main(argv=None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Serve a local stub of the World Bank API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5050)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of delay added to every response')
+    args = parser.parse_args(argv)
+
+    stub = StubWorldBank(args.host, args.port, latency=args.latency)
+    print(f'Stub World Bank API listening on {stub.endpoint}')
+    stub.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Shared HTTP client for every World Bank API call.
+
+wbgapi issues a fresh requests.get for each page it reads, which opens a new
+connection every time and has no timeout or retry policy. This module builds
+one pooled requests.Session with keep-alive connections sized to the server's
+concurrency, per-call connect/read timeouts and bounded retries with jittered
+exponential backoff, and routes all of wbgapi's HTTP traffic through it.
+Request, retry and connection counters are kept for reporting on /health.
+"""
+
+import logging
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+import wbgapi as wb
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive connections per upstream host; match the server's worker threads
+UPSTREAM_POOL_SIZE = 16
+
+# (connect, read) timeout in seconds for each HTTP call
+UPSTREAM_TIMEOUT = (3.05, 10.0)
+
+# Retries after the first attempt for connection errors, timeouts and 5xx
+UPSTREAM_MAX_RETRIES = 2
+
+# Exponential backoff base in seconds, plus up to this much random jitter
+UPSTREAM_BACKOFF_FACTOR = 0.5
+UPSTREAM_BACKOFF_JITTER = 0.5
+
+# Statuses worth retrying; other errors are returned to wbgapi immediately
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class UpstreamStats:
+    """Thread-safe counters for upstream requests and retries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def add(self, name: str, amount: int = 1) -> None:
+        """Increment a counter by name."""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def reset(self) -> None:
+        """Zero every counter."""
+        with self._lock:
+            self.requests = self.retries = self.failures = 0
+
+
+stats = UpstreamStats()
+
+
+class CountingRetry(Retry):
+    """urllib3 Retry policy that records every retry it schedules."""
+
+    def increment(self, *args, **kwargs):
+        # Raises MaxRetryError once the budget is exhausted, so only
+        # retries that are actually attempted get counted
+        new_retry = super().increment(*args, **kwargs)
+        stats.add('retries')
+        return new_retry
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout to every request."""
+
+    def __init__(self, *args, timeout: Tuple[float, float] = UPSTREAM_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        stats.add('requests')
+        try:
+            return super().send(request, **kwargs)
+        except requests.RequestException:
+            stats.add('failures')
+            raise
+
+
+def create_session(pool_size: int = UPSTREAM_POOL_SIZE,
+                   timeout: Tuple[float, float] = UPSTREAM_TIMEOUT,
+                   max_retries: int = UPSTREAM_MAX_RETRIES,
+                   backoff_factor: float = UPSTREAM_BACKOFF_FACTOR,
+                   backoff_jitter: float = UPSTREAM_BACKOFF_JITTER) -> requests.Session:
+    """
+    Build a pooled session with timeouts and retries for the World Bank API.
+
+    Args:
+        pool_size: Maximum keep-alive connections kept per host
+        timeout: (connect, read) timeout in seconds for each HTTP call
+        max_retries: Retries after the first attempt
+        backoff_factor: Base of the exponential backoff in seconds
+        backoff_jitter: Maximum random seconds added to each backoff
+
+    Returns:
+        Configured requests.Session
+    """
+    retry = CountingRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({'GET'}),
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_jitter,
+        # Hand the final 5xx back to wbgapi so it raises its usual APIError
+        raise_on_status=False,
+    )
+    adapter = TimeoutHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                 max_retries=retry, timeout=timeout)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_session: Optional[requests.Session] = None
+
+
+def configure_upstream(endpoint: Optional[str] = None, **session_options) -> requests.Session:
+    """
+    Install a shared session for all wbgapi HTTP calls.
+
+    wbgapi calls the module-level requests.get; it is pointed at the shared
+    session's get instead, so every wbgapi call reuses pooled connections
+    and the retry and timeout policy above.
+
+    Args:
+        endpoint: Optional World Bank API base URL (e.g. a local stub)
+        **session_options: Keyword arguments passed to create_session
+
+    Returns:
+        The installed session
+    """
+    global _session
+
+    session = create_session(**session_options)
+    previous, _session = _session, session
+    stats.reset()
+    wb.requests = SimpleNamespace(get=session.get)
+
+    if endpoint is not None:
+        wb.endpoint = endpoint
+    if previous is not None:
+        previous.close()
+
+    logger.info(f"Upstream client configured for {wb.endpoint}")
+    return session
+
+
+def get_upstream_stats() -> Dict[str, Any]:
+    """
+    Report request, retry and connection reuse counters.
+
+    Returns:
+        Dictionary with request and retry counts, the number of TCP
+        connections opened, and the share of requests on a reused connection
+    """
+    connections = 0
+    pooled_requests = 0
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    pooled_requests += pool.num_requests
+
+    return {
+        'endpoint': wb.endpoint,
+        'requests': stats.requests,
+        'retries': stats.retries,
+        'failures': stats.failures,
+        'connections_opened': connections,
+        'connection_reuse': 1 - connections / pooled_requests if pooled_requests else 0.0,
+    }
@@ -6,6 +6,12 @@ class GDPFertilityVisualization {
     this.isPlaying = false;
     this.playInterval = null;
 
+    // Point at the static build (see backend/build_static.py) by setting
+    // window.GDP_VIZ_CONFIG = { apiBase: "https://cdn.example.com/viz", static: true }
+    const config = window.GDP_VIZ_CONFIG || {};
+    this.apiBase = config.apiBase || "http://localhost:5001";
+    this.staticMode = Boolean(config.static);
+
     this.margin = { top: 20, right: 100, bottom: 60, left: 80 };
     this.width = 900 - this.margin.left - this.margin.right;
     this.height = 600 - this.margin.top - this.margin.bottom;
@@ -31,12 +37,13 @@ class GDPFertilityVisualization {
 
   async fetchData() {
     try {
-      const response = await axios.get("http://localhost:5001/data");
+      // The API fills reporting gaps so countries stay on screen during
+      // playback; static builds serve the series as published
+      const params = this.staticMode ? {} : { fill: "log-linear" };
+      const response = await axios.get(this.apiUrl("/data"), { params });
       this.data = response.data;
 
-      const countriesResponse = await axios.get(
-        "http://localhost:5001/countries",
-      );
+      const countriesResponse = await axios.get(this.apiUrl("/countries"));
       this.countries = countriesResponse.data.countries;
 
       console.log("Data loaded successfully");
@@ -48,6 +55,11 @@ class GDPFertilityVisualization {
     }
   }
 
+  apiUrl(path) {
+    // Static builds store each response as <path>.json
+    return `${this.apiBase}${path}${this.staticMode ? ".json" : ""}`;
+  }
+
   setupSVG() {
     this.svg = d3
       .select("#scatter-plot")
@@ -233,12 +245,16 @@ class GDPFertilityVisualization {
 
       if (gdp && fertility && gdp > 0 && fertility > 0) {
         const countryInfo = this.countries.find((c) => c.code === countryCode);
+        const imputed = country.imputed || {};
         yearData.push({
           country: countryCode,
           name: countryInfo ? countryInfo.name : countryCode,
           gdp: gdp,
           fertility: fertility,
           region: countryInfo ? countryInfo.region : "Unknown",
+          estimated: ["gdp", "fertility"].some((name) =>
+            (imputed[name] || []).includes(String(year)),
+          ),
         });
       }
     }
@@ -273,6 +289,7 @@ class GDPFertilityVisualization {
                     <strong>${d.name}</strong><br/>
                     GDP per capita: $${d3.format(",.0f")(d.gdp)}<br/>
                     Fertility rate: ${d3.format(".2f")(d.fertility)}
+                    ${d.estimated ? "<br/><em>Includes interpolated values</em>" : ""}
                 `,
           )
           .style("left", event.pageX + 10 + "px")
@@ -7,16 +7,40 @@ integration with the World Bank API.
 """
 
 import unittest
+import asyncio
+import gzip
+import hashlib
+import io
 import json
+import logging
 import sys
 import os
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch, MagicMock
 
 # Add the backend directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-from app import app
+from app import app, response_cache
+import aggregation
+import asgi_app
+import async_fetcher
+import build_static
+import compression
 import data_fetcher
+import dataset
+import gap_fill
+import indicators
+import ingest
+import loadtest
+import refresher
+import snapshot
+import structured_logging
+import upstream
+from starlette.testclient import TestClient
+from stub_worldbank import STUB_COUNTRIES, STUB_YEARS, StubWorldBank, stub_value
 
 
 class TestDataFetcher(unittest.TestCase):
@@ -375,5 +399,1017 @@ class TestFlaskAPI(unittest.TestCase):
         self.assertEqual(data['error'], 'Not found')
 
 
+class TestRegionAggregation(unittest.TestCase):
+    """Test region-level aggregation of per-country series."""
+
+    REGIONS = {'USA': 'North America', 'CAN': 'North America', 'GBR': 'Europe & Central Asia'}
+    GDP = {
+        'USA': {'2020': 60000.0, '2021': 70000.0},
+        'CAN': {'2020': 40000.0},
+        'GBR': {'2020': 45000.0, '2021': 47000.0},
+    }
+
+    def setUp(self):
+        """Start every test with an empty aggregate cache."""
+        aggregation.clear_aggregate_cache()
+
+    def test_aggregate_by_region_statistics(self):
+        """Test per-region summary statistics for each year."""
+        result = aggregation.aggregate_by_region({'gdp': self.GDP}, self.REGIONS, 2020, 2021)
+
+        north_america = result['North America']
+        self.assertEqual(north_america['countries'], ['CAN', 'USA'])
+        self.assertEqual(north_america['gdp']['2020'], {
+            'mean': 50000.0, 'median': 50000.0, 'min': 40000.0, 'max': 60000.0, 'count': 2
+        })
+        self.assertEqual(north_america['gdp']['2021']['count'], 1)
+        self.assertEqual(result['Europe & Central Asia']['gdp']['2021']['mean'], 47000.0)
+
+    def test_aggregate_by_region_skips_empty_years(self):
+        """Test that years without observations are omitted."""
+        result = aggregation.aggregate_by_region({'gdp': self.GDP}, self.REGIONS, 2019, 2021)
+        self.assertNotIn('2019', result['North America']['gdp'])
+
+    def test_aggregate_by_region_population_weighted(self):
+        """Test population-weighted means with fallback for missing weights."""
+        population = {'USA': {'2020': 3.0}, 'CAN': {'2020': 1.0}}
+        result = aggregation.aggregate_by_region({'gdp': self.GDP}, self.REGIONS, 2020, 2021, population)
+
+        north_america = result['North America']['gdp']
+        self.assertEqual(north_america['2020']['mean'], 55000.0)
+        self.assertEqual(north_america['2020']['median'], 50000.0)
+        # No population for 2021, so the unweighted mean is used
+        self.assertEqual(north_america['2021']['mean'], 70000.0)
+
+    @patch('data_fetcher.fetch_indicator_data')
+    def test_fetch_region_aggregates_cached_per_version(self, mock_fetch):
+        """Test that aggregates are cached until the dataset version changes."""
+        mock_fetch.side_effect = lambda name, *args: self.GDP if name == 'gdp' else {}
+        catalog = [{'code': code, 'name': code, 'region': region} for code, region in self.REGIONS.items()]
+
+        first = data_fetcher.fetch_region_aggregates(['USA', 'CAN', 'GBR'], 2020, 2021, available_countries=catalog)
+        second = data_fetcher.fetch_region_aggregates(['GBR', 'USA', 'CAN'], 2020, 2021, available_countries=catalog)
+        self.assertIs(first, second)
+        self.assertEqual(mock_fetch.call_count, 2)
+
+        dataset.clear_snapshot()
+        data_fetcher.fetch_region_aggregates(['USA', 'CAN', 'GBR'], 2020, 2021, available_countries=catalog)
+        self.assertEqual(mock_fetch.call_count, 4)
+
+    @patch('data_fetcher.fetch_indicator_data')
+    def test_live_aggregates_expire(self, mock_fetch):
+        """Test that aggregates of live data are recomputed once their TTL passes."""
+        mock_fetch.side_effect = lambda name, *args: self.GDP if name == 'gdp' else {}
+        catalog = [{'code': code, 'name': code, 'region': region} for code, region in self.REGIONS.items()]
+
+        data_fetcher.fetch_region_aggregates(['USA', 'CAN', 'GBR'], 2020, 2021, available_countries=catalog)
+        with patch('dataset.time.monotonic', return_value=dataset.time.monotonic() + dataset.DERIVED_CACHE_TTL + 1):
+            data_fetcher.fetch_region_aggregates(['USA', 'CAN', 'GBR'], 2020, 2021, available_countries=catalog)
+        self.assertEqual(mock_fetch.call_count, 4)
+
+    @patch('app.fetch_region_aggregates')
+    @patch('app.get_available_countries')
+    def test_data_endpoint_region_aggregate(self, mock_countries, mock_aggregates):
+        """Test the data endpoint aggregates all countries by region."""
+        mock_countries.return_value = [{'code': 'USA', 'name': 'United States', 'region': 'North America'}]
+        mock_aggregates.return_value = {'regions': {}, 'years': [2020], 'metadata': {}}
+
+        response = app.test_client().get('/data?aggregate=region&weight=population&start_year=2020&end_year=2020')
+        self.assertEqual(response.status_code, 200)
+        args, kwargs = mock_aggregates.call_args
+        self.assertEqual(args[0], ['USA'])
+        self.assertEqual(kwargs['weight'], 'population')
+
+    @patch('app.fetch_region_aggregates')
+    @patch('app.get_available_countries')
+    def test_indicator_aggregate_omits_country_lists(self, mock_countries, mock_aggregates):
+        """Test that region overviews do not echo the whole catalog back."""
+        mock_countries.return_value = [{'code': 'USA', 'name': 'United States', 'region': 'North America'}]
+        mock_aggregates.return_value = {'regions': {'North America': {'countries': ['USA']}}}
+
+        data = json.loads(app.test_client().get('/data/gdp?aggregate=region&start_year=2020&end_year=2020').data)
+        self.assertEqual(data['data'], {'North America': {'countries': ['USA']}})
+        self.assertIsNone(data['requested_countries'])
+        self.assertIsNone(data['valid_countries'])
+
+    def test_data_endpoint_invalid_aggregate(self):
+        """Test the data endpoint rejects unsupported aggregate modes."""
+        response = app.test_client().get('/data?countries=USA&aggregate=continent')
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(response.data)
+        self.assertEqual(data['error'], 'Invalid parameters')
+
+
+class TestStaticBuild(unittest.TestCase):
+    """Test snapshot slicing and the static response build."""
+
+    SNAPSHOT = {
+        'format': snapshot.SNAPSHOT_FORMAT,
+        'created_at': '2024-01-01T00:00:00+00:00',
+        'start_year': 2020,
+        'end_year': 2021,
+        'countries': [
+            {'code': 'USA', 'name': 'United States', 'region': 'North America'},
+            {'code': 'ABW', 'name': 'Aruba', 'region': 'Latin America & Caribbean'},
+        ],
+        'indicators': {
+            'gdp': {'USA': {'2020': 63000.0, '2021': 70000.0}, 'ABW': {'2020': 24000.0}},
+            'fertility': {'USA': {'2020': 1.6}, 'ABW': {}},
+        },
+    }
+
+    def test_slice_combined_matches_fetch_shape(self):
+        """Test that snapshot slices have the combined data shape."""
+        data = snapshot.slice_combined(self.SNAPSHOT, ['USA', 'GBR'], 2021, 2021)
+        self.assertEqual(data['years'], [2021])
+        self.assertEqual(data['countries'], {'USA': {'gdp': {'2021': 70000.0}, 'fertility': {}}})
+        self.assertEqual(data['metadata']['gdp_indicator'], 'NY.GDP.PCAP.CD')
+
+    def test_year_frame(self):
+        """Test per-year frames include countries with any value."""
+        frame = snapshot.year_frame(self.SNAPSHOT, 2020)
+        self.assertEqual(frame['countries']['USA'], {'gdp': 63000.0, 'fertility': 1.6})
+        self.assertEqual(frame['countries']['ABW'], {'gdp': 24000.0, 'fertility': None})
+
+    def test_build_static_site(self):
+        """Test static files, precompressed variants and manifest hashes."""
+        with tempfile.TemporaryDirectory() as output_dir:
+            manifest = build_static.build_static_site(self.SNAPSHOT, output_dir)
+
+            self.assertIn('frames/2021.json', manifest['files'])
+            with open(os.path.join(output_dir, 'data.json'), 'rb') as f:
+                body = f.read()
+            self.assertEqual(json.loads(body)['countries'].keys(), {'USA'})
+            self.assertEqual(manifest['files']['data.json']['sha256'], hashlib.sha256(body).hexdigest())
+
+            with open(os.path.join(output_dir, 'data.json.gz'), 'rb') as f:
+                self.assertEqual(gzip.decompress(f.read()), body)
+            with open(os.path.join(output_dir, 'countries.json.br'), 'rb') as f:
+                countries = json.loads(build_static.brotli.decompress(f.read()))
+            self.assertEqual(countries['countries'], self.SNAPSHOT['countries'])
+            self.assertTrue(os.path.exists(os.path.join(output_dir, 'manifest.json.br')))
+
+    def test_main_rejects_invalid_snapshot(self):
+        """Test the CLI fails cleanly on a file that is not a snapshot."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'snapshot.json')
+            with open(path, 'w') as f:
+                json.dump({'format': 0}, f)
+            self.assertEqual(build_static.main(['--snapshot', path, '--output', tmp]), 1)
+
+
+class TestCompression(unittest.TestCase):
+    """Test negotiated compression and the encoded-body cache."""
+
+    COMBINED = {
+        'countries': {'USA': {'gdp': {str(year): 50000.0 + year for year in range(1960, 2024)}, 'fertility': {}}},
+        'years': list(range(1960, 2024)),
+        'metadata': {},
+    }
+
+    def setUp(self):
+        """Set up test client with an empty response cache."""
+        self.app = app.test_client()
+        response_cache.clear()
+
+    def test_negotiate_encoding(self):
+        """Test Accept-Encoding negotiation and q-values."""
+        self.assertEqual(compression.negotiate_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(compression.negotiate_encoding('gzip'), 'gzip')
+        self.assertEqual(compression.negotiate_encoding('br;q=0.5, gzip;q=0.8'), 'gzip')
+        self.assertEqual(compression.negotiate_encoding('br;q=0, *'), 'gzip')
+        self.assertEqual(compression.negotiate_encoding(None), 'identity')
+
+    def test_normalize_query_ignores_parameter_order(self):
+        """Test that parameter order does not change the key but the countries value does."""
+        from werkzeug.datastructures import MultiDict
+        first = compression.normalize_query('/data', MultiDict({'countries': 'USA,GBR', 'end_year': '2020'}))
+        second = compression.normalize_query('/data', MultiDict({'end_year': '2020', 'countries': 'USA,GBR'}))
+        self.assertEqual(first, second)
+
+        for countries in ('GBR,USA', 'usa,GBR', 'USA,GBR,USA'):
+            other = compression.normalize_query('/data', MultiDict({'countries': countries, 'end_year': '2020'}))
+            self.assertNotEqual(first, other)
+
+    @patch('app.fetch_indicator_data')
+    @patch('app.validate_country_codes')
+    def test_cached_body_echoes_its_own_query(self, mock_validate, mock_fetch):
+        """Test that a query in a different country order is not answered with another query's body."""
+        mock_validate.side_effect = lambda codes: codes
+        mock_fetch.return_value = {}
+
+        self.app.get('/data/gdp?countries=USA,GBR')
+        response = self.app.get('/data/gdp?countries=GBR,USA')
+
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        self.assertEqual(json.loads(response.data)['requested_countries'], ['GBR', 'USA'])
+
+    @patch('app.fetch_combined_data')
+    @patch('app.validate_country_codes')
+    def test_repeat_request_served_from_cache(self, mock_validate, mock_fetch):
+        """Test that repeat requests reuse the stored compressed body."""
+        mock_validate.return_value = ['USA']
+        mock_fetch.return_value = self.COMBINED
+
+        first = self.app.get('/data?countries=USA', headers={'Accept-Encoding': 'gzip'})
+        second = self.app.get('/data?countries=USA', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(first.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(first.headers['X-Cache'], 'MISS')
+        self.assertEqual(second.headers['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(json.loads(gzip.decompress(second.data))['years'][0], 1960)
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(response_cache.stats()['hits'], 1)
+
+    @patch('app.fetch_combined_data')
+    @patch('app.validate_country_codes')
+    def test_cache_keyed_by_encoding_and_version(self, mock_validate, mock_fetch):
+        """Test that encoding and dataset version are part of the key."""
+        mock_validate.return_value = ['USA']
+        mock_fetch.return_value = self.COMBINED
+
+        self.app.get('/data?countries=USA', headers={'Accept-Encoding': 'gzip'})
+        response = self.app.get('/data?countries=USA', headers={'Accept-Encoding': 'br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(mock_fetch.call_count, 2)
+
+        dataset.clear_snapshot()
+        self.app.get('/data?countries=USA', headers={'Accept-Encoding': 'br'})
+        self.assertEqual(mock_fetch.call_count, 3)
+
+    @patch('app.get_available_countries')
+    def test_small_response_not_compressed(self, mock_countries):
+        """Test that bodies below the size threshold go out uncompressed."""
+        mock_countries.return_value = [{'code': 'USA', 'name': 'United States', 'region': 'North America'}]
+
+        response = self.app.get('/countries', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(json.loads(response.data)['countries'][0]['code'], 'USA')
+
+    @patch('app.fetch_combined_data')
+    def test_error_responses_not_cached(self, mock_fetch):
+        """Test that failed responses are never stored."""
+        mock_fetch.side_effect = Exception("Data fetch error")
+        with patch('app.validate_country_codes', return_value=['USA']):
+            self.app.get('/data?countries=USA')
+        self.assertEqual(response_cache.stats()['entries'], 0)
+
+
+class TestUpstreamClient(unittest.TestCase):
+    """Test the pooled upstream session against a local stub World Bank API."""
+
+    def setUp(self):
+        """Remember the real endpoint so it can be restored."""
+        self.endpoint = data_fetcher.wb.endpoint
+
+    def tearDown(self):
+        """Restore the default upstream configuration."""
+        upstream.configure_upstream(endpoint=self.endpoint)
+
+    def test_connections_reused_across_calls(self):
+        """Test that wbgapi calls share keep-alive connections."""
+        with StubWorldBank() as stub:
+            upstream.configure_upstream(endpoint=stub.endpoint)
+            data = data_fetcher.fetch_combined_data(['USA', 'GBR'], 2000, 2005)
+            countries = data_fetcher.get_available_countries()
+
+            self.assertIn('USA', data['countries'])
+            self.assertIn('USA', {country['code'] for country in countries})
+            self.assertEqual(stub.connections_opened, 1)
+
+            stats = upstream.get_upstream_stats()
+            self.assertEqual(stats['connections_opened'], 1)
+            self.assertEqual(stats['requests'], stub.requests_served)
+            self.assertGreater(stats['connection_reuse'], 0.5)
+
+    def test_retries_server_errors(self):
+        """Test that 5xx responses are retried with backoff."""
+        with StubWorldBank(fail_requests=2) as stub:
+            upstream.configure_upstream(endpoint=stub.endpoint, backoff_factor=0, backoff_jitter=0.01)
+            regions = list(data_fetcher.wb.region.list())
+
+            self.assertGreater(len(regions), 0)
+            self.assertEqual(upstream.get_upstream_stats()['retries'], 2)
+
+    def test_gives_up_after_retry_budget(self):
+        """Test that persistent 5xx responses surface as an API error."""
+        with StubWorldBank(fail_requests=10) as stub:
+            upstream.configure_upstream(endpoint=stub.endpoint, max_retries=1, backoff_factor=0)
+            with self.assertRaises(data_fetcher.wb.APIError):
+                list(data_fetcher.wb.region.list())
+            self.assertEqual(stub.requests_served, 2)
+
+    def test_read_timeout(self):
+        """Test that a hung upstream call is cut off by the read timeout."""
+        with StubWorldBank(latency=0.5) as stub:
+            upstream.configure_upstream(endpoint=stub.endpoint, timeout=(1.0, 0.1), max_retries=1, backoff_factor=0)
+            with self.assertRaises(Exception):
+                list(data_fetcher.wb.region.list())
+
+            stats = upstream.get_upstream_stats()
+            self.assertEqual(stats['retries'], 1)
+            self.assertEqual(stats['failures'], 1)
+
+
+class TestDatasetRefresher(unittest.TestCase):
+    """Test versioned snapshot publishing and the background refresher."""
+
+    def setUp(self):
+        """Point upstream calls at a local stub World Bank API."""
+        self.endpoint = data_fetcher.wb.endpoint
+        self.stub = StubWorldBank().start()
+        upstream.configure_upstream(endpoint=self.stub.endpoint)
+
+    def tearDown(self):
+        """Drop any published snapshot and restore the real endpoint."""
+        dataset.clear_snapshot()
+        self.stub.stop()
+        upstream.configure_upstream(endpoint=self.endpoint)
+
+    def test_publish_snapshot_bumps_version(self):
+        """Test that publishing assigns a new, increasing version."""
+        before = dataset.get_dataset_version()
+        version = dataset.publish_snapshot(TestStaticBuild.SNAPSHOT)
+
+        self.assertGreater(version, before)
+        self.assertEqual(dataset.get_snapshot()['version'], version)
+        self.assertEqual(dataset.get_dataset_info()['source'], 'snapshot')
+        self.assertNotIn('version', TestStaticBuild.SNAPSHOT)
+
+    def test_reloaded_snapshot_keeps_its_version(self):
+        """Test that a saved snapshot comes back under its stored version after a restart."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'snapshot.json')
+            dataset.publish_snapshot(dict(TestStaticBuild.SNAPSHOT, version=dataset.get_dataset_version() + 5))
+            stored = dataset.get_snapshot()['version']
+            snapshot.save_snapshot(dataset.get_snapshot(), path)
+
+            # A fresh process starts counting from 1
+            with patch('dataset._version', 1):
+                self.assertEqual(dataset.publish_snapshot(snapshot.load_snapshot(path)), stored)
+                self.assertEqual(dataset.get_dataset_version(), stored)
+                self.assertEqual(dataset.publish_snapshot(dataset.get_snapshot()), stored + 1)
+
+    @patch('data_fetcher.wb.data.fetch')
+    def test_reads_served_from_snapshot(self, mock_fetch):
+        """Test that published data is served without upstream calls."""
+        mock_fetch.side_effect = Exception("API Error")
+        dataset.publish_snapshot(TestStaticBuild.SNAPSHOT)
+
+        data = data_fetcher.fetch_combined_data(['USA'], 2021, 2021)
+        self.assertEqual(data['countries']['USA'], {'gdp': {'2021': 70000.0}, 'fertility': {}})
+        self.assertEqual(data_fetcher.validate_country_codes(['USA', 'GBR']), ['USA'])
+        mock_fetch.assert_not_called()
+
+    def test_refresh_indicator_publishes_new_snapshot(self):
+        """Test that a refresh swaps in a new snapshot and leaves the old one intact."""
+        job_runner = refresher.DatasetRefresher()
+        first_version = job_runner.refresh_all()
+        first = dataset.get_snapshot()
+        self.assertIn('USA', first['indicators']['population'])
+
+        served_before = self.stub.requests_served
+        second_version = job_runner.refresh('fertility')
+        second = dataset.get_snapshot()
+
+        self.assertGreater(second_version, first_version)
+        self.assertIsNot(second, first)
+        self.assertEqual(first['version'], first_version)
+        self.assertIs(second['indicators']['gdp'], first['indicators']['gdp'])
+        self.assertGreater(self.stub.requests_served, served_before)
+
+    def test_run_pending_reschedules_with_jitter(self):
+        """Test that due jobs run and are rescheduled within the jitter bounds."""
+        job_runner = refresher.DatasetRefresher(intervals={'catalog': 100.0, 'gdp': 100.0}, jitter=0.1,
+                                                retry_interval=10.0)
+        job_runner.refresh_all()
+
+        with patch.object(refresher.DatasetRefresher, 'refresh', return_value=1), \
+                patch.object(refresher.DatasetRefresher, 'ingest', side_effect=Exception("API Error")):
+            start = refresher.time.monotonic()
+            job_runner.run_pending()
+
+        self.assertTrue(90.0 <= job_runner.next_run['catalog'] - start <= 110.1)
+        self.assertTrue(9.0 <= job_runner.next_run['gdp'] - start <= 11.1)
+
+    def test_due_indicators_published_together(self):
+        """Test that all due indicators are refreshed in one ingestion pass and one publish."""
+        job_runner = refresher.DatasetRefresher(intervals={'catalog': 100.0, 'gdp': 100.0, 'fertility': 100.0,
+                                                           'population': 100.0})
+        job_runner.refresh_all()
+        job_runner.next_run = {'catalog': refresher.time.monotonic() + 100.0}
+        before = dataset.get_dataset_version()
+
+        with patch('snapshot.ingest_indicators', wraps=snapshot.ingest_indicators) as ingest_indicators:
+            job_runner.run_pending()
+
+        ingest_indicators.assert_called_once()
+        self.assertEqual(ingest_indicators.call_args[0][0], ['gdp', 'fertility', 'population'])
+        self.assertEqual(dataset.get_dataset_version(), before + 1)
+        self.assertTrue(all(job_runner.next_run[job] > refresher.time.monotonic() for job in job_runner.intervals))
+
+    def test_first_runs_scheduled_from_snapshot_age(self):
+        """Test that a loaded snapshot's jobs are due according to when it was built."""
+        built = datetime.now(timezone.utc) - timedelta(hours=7)
+        dataset.publish_snapshot(dict(TestStaticBuild.SNAPSHOT, created_at=built.isoformat()))
+        job_runner = refresher.DatasetRefresher(intervals={'catalog': 24 * 3600.0, 'gdp': 6 * 3600.0}, jitter=0)
+
+        start = refresher.time.monotonic()
+        job_runner.schedule_initial_runs()
+
+        self.assertLessEqual(job_runner.next_run['gdp'] - start, 1.0)
+        self.assertAlmostEqual(job_runner.next_run['catalog'] - start, 17 * 3600.0, delta=5.0)
+
+    def test_main_starts_from_existing_snapshot(self):
+        """Test that the standalone refresher serves the snapshot file before its schedule starts."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'snapshot.json')
+            snapshot.save_snapshot(TestStaticBuild.SNAPSHOT, path)
+
+            with patch.object(refresher.DatasetRefresher, 'run_forever',
+                              side_effect=lambda: self.assertIsNotNone(dataset.get_snapshot())) as run_forever:
+                self.assertEqual(refresher.main(['--snapshot', path]), 0)
+            run_forever.assert_called_once()
+
+    def test_health_reports_dataset_version(self):
+        """Test that the health endpoint exposes the dataset version."""
+        version = dataset.publish_snapshot(TestStaticBuild.SNAPSHOT)
+        data = json.loads(app.test_client().get('/health').data)
+        self.assertEqual(data['dataset_version'], version)
+        self.assertEqual(data['dataset']['source'], 'snapshot')
+
+    def test_background_refresher_builds_initial_snapshot(self):
+        """Test that the scheduler thread publishes a snapshot without blocking."""
+        job_runner = refresher.DatasetRefresher().start()
+        try:
+            for _ in range(100):
+                if dataset.get_snapshot() is not None:
+                    break
+                refresher.time.sleep(0.05)
+            self.assertIsNotNone(dataset.get_snapshot())
+        finally:
+            job_runner.stop(timeout=5)
+
+
+class TestAsyncApp(unittest.TestCase):
+    """Test the async client and ASGI app against a local stub World Bank API."""
+
+    def setUp(self):
+        """Start a stub and remember the real endpoint so it can be restored."""
+        self.endpoint = data_fetcher.wb.endpoint
+        self.stub = StubWorldBank().start()
+        aggregation.clear_aggregate_cache()
+        response_cache.clear()
+        asgi_app.response_cache.clear()
+
+    def tearDown(self):
+        """Stop the stub and restore the default upstream configuration."""
+        self.stub.stop()
+        upstream.configure_upstream(endpoint=self.endpoint)
+
+    def run_client(self, method, *args, **client_options):
+        """Call an AsyncWorldBankClient method on a fresh client and return the result with its stats."""
+        async def call():
+            async with async_fetcher.AsyncWorldBankClient(self.stub.endpoint, **client_options) as client:
+                return await getattr(client, method)(*args), client.get_stats()
+        return asyncio.run(call())
+
+    def test_matches_sync_fetcher(self):
+        """Test that the async client returns the same data as the wbgapi path."""
+        upstream.configure_upstream(endpoint=self.stub.endpoint)
+        expected = data_fetcher.fetch_combined_data(['USA', 'GBR', 'NGA'], 1960, 2010)
+        countries = data_fetcher.get_available_countries()
+
+        data, _ = self.run_client('fetch_combined_data', ['USA', 'GBR', 'NGA'], 1960, 2010)
+        self.assertEqual(data, expected)
+
+        catalog, _ = self.run_client('get_available_countries')
+        self.assertEqual(catalog, countries)
+        self.assertNotIn('WLD', {country['code'] for country in catalog})
+
+    def test_pages_fetched(self):
+        """Test that multi-page results are read in full."""
+        data, stats = self.run_client('fetch_gdp_data', ['USA', 'CHN'], 1960, 2023, page_size=10)
+
+        for code in ('USA', 'CHN'):
+            expected = {str(year): stub_value(data_fetcher.GDP_INDICATOR, code, year) for year in STUB_YEARS}
+            self.assertEqual(data[code], {year: value for year, value in expected.items() if value is not None})
+        self.assertGreater(stats['requests'], 10)
+
+    def test_concurrency_bounded(self):
+        """Test that upstream requests never exceed the semaphore limit."""
+        self.stub.latency = 0.05
+
+        async def call():
+            async with async_fetcher.AsyncWorldBankClient(self.stub.endpoint, concurrency=2) as client:
+                await asyncio.gather(*(client.fetch_gdp_data([code], 2000, 2001)
+                                       for code in data_fetcher.DEFAULT_COUNTRIES[:8]))
+                return client.get_stats()
+
+        stats = asyncio.run(call())
+        self.assertEqual(stats['requests'], 8)
+        self.assertLessEqual(self.stub.connections_opened, 2)
+
+    def test_retries_server_errors(self):
+        """Test that 5xx responses are retried and persistent ones raised."""
+        self.stub.fail_requests = 2
+        data, stats = self.run_client('fetch_gdp_data', ['USA'], 2000, 2001, backoff_factor=0, backoff_jitter=0.01)
+        self.assertIn('USA', data)
+        self.assertEqual(stats['retries'], 2)
+
+        self.stub.fail_requests = 10
+        with self.assertRaises(async_fetcher.httpx.HTTPStatusError):
+            self.run_client('fetch_gdp_data', ['USA'], 2000, 2001, max_retries=1, backoff_factor=0)
+
+    def test_asgi_matches_flask(self):
+        """Test that the ASGI app serves the same bodies as the Flask app."""
+        upstream.configure_upstream(endpoint=self.stub.endpoint)
+        paths = [
+            '/data?countries=USA,GBR&start_year=2000&end_year=2005',
+            '/data/gdp?countries=USA,XXX&start_year=2000&end_year=2002',
+            '/data/fertility?aggregate=region&weight=population&start_year=2000&end_year=2001',
+            '/data?countries=USA,NGA&start_year=1960&end_year=1980&fill=linear',
+            '/data/gdp?countries=USA,NGA&start_year=1960&end_year=1980&fill=carry-forward',
+        ]
+
+        with patch.dict(os.environ, {'GDP_VIZ_UPSTREAM': self.stub.endpoint}), \
+                TestClient(asgi_app.app) as client:
+            for path in paths:
+                response = client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), json.loads(app.test_client().get(path).data))
+
+            self.assertEqual(client.get(paths[0]).headers['X-Cache'], 'HIT')
+            self.assertIn('upstream', client.get('/health').json())
+
+    def test_asgi_errors(self):
+        """Test that the ASGI app reports bad parameters like the Flask app."""
+        with patch.dict(os.environ, {'GDP_VIZ_UPSTREAM': self.stub.endpoint}), \
+                TestClient(asgi_app.app) as client:
+            response = client.get('/data/gdp')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], 'Missing required parameter')
+
+            for query in ('aggregate=country', 'weight=population', 'aggregate=region&fill=linear'):
+                response = client.get(f'/data?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], 'Invalid parameters')
+                self.assertEqual(response.json()['message'],
+                                 json.loads(app.test_client().get(f'/data?{query}').data)['message'])
+
+            response = client.get('/data?countries=XXX')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], 'Invalid countries')
+
+            self.assertEqual(client.get('/nonexistent').status_code, 404)
+
+
+class TestLoadTest(unittest.TestCase):
+    """Test the load-testing harness helpers."""
+
+    def test_mix_picker_follows_weights(self):
+        """Test that request kinds are drawn in proportion to their weights."""
+        pick = loadtest.mix_picker(loadtest.REQUEST_MIXES['realistic'])
+        rng = loadtest.random.Random(1)
+        kinds = [pick(rng)[0] for _ in range(4000)]
+
+        for name, weight, _ in loadtest.REQUEST_MIXES['realistic']:
+            self.assertAlmostEqual(kinds.count(name) / len(kinds), weight, delta=0.03)
+
+    def test_paths_are_valid_queries(self):
+        """Test that generated paths are accepted by the app."""
+        rng = loadtest.random.Random(2)
+        self.addCleanup(response_cache.clear)
+        with patch('app.fetch_combined_data', return_value={}), \
+                patch('app.fetch_indicator_data', return_value={}), \
+                patch('app.validate_country_codes', side_effect=lambda codes: codes), \
+                patch('app.get_available_countries', return_value=[]):
+            client = app.test_client()
+            for build in (loadtest.random_data_path, loadtest.indicator_path, loadtest.default_data_path):
+                self.assertEqual(client.get(build(rng)).status_code, 200)
+
+    def test_summary_and_sustained_concurrency(self):
+        """Test percentiles, error rates and the sustained concurrency rule."""
+        summary = loadtest.summarize([0.1] * 90 + [1.0] * 10, errors=0, elapsed=10.0)
+        self.assertEqual(summary['p50'], 0.1)
+        self.assertEqual(summary['p95'], 1.0)
+        self.assertEqual(summary['throughput'], 10.0)
+        self.assertEqual(loadtest.summarize([], errors=4, elapsed=1.0)['error_rate'], 1.0)
+
+        levels = [
+            {'concurrency': 4, 'errors': 0, 'p95': 0.5},
+            {'concurrency': 8, 'errors': 0, 'p95': 1.5},
+            {'concurrency': 16, 'errors': 1, 'p95': 1.0},
+            {'concurrency': 32, 'errors': 0, 'p95': 1.0},
+        ]
+        self.assertEqual(loadtest.sustained_concurrency(levels, slo=2.0), 8)
+        self.assertEqual(loadtest.sustained_concurrency(levels, slo=1.0), 4)
+
+    def test_process_cpu(self):
+        """Test that CPU time is read for the current process."""
+        start = loadtest.process_tree_cpu(os.getpid())
+        sum(i * i for i in range(2000000))
+        self.assertGreater(loadtest.process_tree_cpu(os.getpid()), start)
+
+
+class TestStructuredLogging(unittest.TestCase):
+    """Test queued JSON logging, sampling and access records."""
+
+    def setUp(self):
+        """Send log lines to a buffer instead of stderr."""
+        self.stream = io.StringIO()
+        self.logger = logging.getLogger('test_structured_logging')
+        response_cache.clear()
+
+    def tearDown(self):
+        """Restore the default logging configuration."""
+        structured_logging.configure_logging()
+
+    def records(self):
+        """Flush the queue and parse every line written so far."""
+        structured_logging.flush_logging()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_json_lines_with_fields(self):
+        """Test that records are written as JSON including extra fields."""
+        structured_logging.configure_logging(sample_rate=1.0, stream=self.stream)
+        self.logger.info("Fetched %d countries", 3, extra={'route': '/data'})
+
+        record = self.records()[-1]
+        self.assertEqual(record['message'], 'Fetched 3 countries')
+        self.assertEqual(record['route'], '/data')
+        self.assertEqual(record['level'], 'INFO')
+        self.assertNotIn('sampled', record)
+
+    def test_formatting_off_request_thread(self):
+        """Test that messages are rendered by the listener, and never when sampled out."""
+        formatted_on = []
+
+        class Argument:
+            def __str__(self):
+                formatted_on.append(threading.current_thread())
+                return 'value'
+
+        structured_logging.configure_logging(sample_rate=0.0, stream=self.stream)
+        self.logger.info("hot %s", Argument(), extra=structured_logging.SAMPLED)
+        self.logger.info("cold %s", Argument())
+        self.logger.warning("hot warning %s", Argument(), extra=structured_logging.SAMPLED)
+
+        self.assertEqual([record['message'] for record in self.records()], ['cold value', 'hot warning value'])
+        self.assertNotIn(threading.current_thread(), formatted_on)
+        self.assertEqual(structured_logging.get_logging_stats()['sampled_out'], 1)
+
+    def test_full_queue_drops_records(self):
+        """Test that a full queue drops records instead of blocking."""
+        structured_logging.configure_logging(sample_rate=1.0, stream=self.stream, queue_size=1)
+        structured_logging.shutdown_logging()
+        for index in range(5):
+            self.logger.info("record %d", index)
+
+        self.assertEqual(structured_logging.get_logging_stats()['dropped'], 4)
+
+    def test_counters_across_threads(self):
+        """Test that records logged from many threads are all counted."""
+        structured_logging.configure_logging(sample_rate=1.0, stream=self.stream)
+
+        def log_many():
+            for index in range(500):
+                self.logger.info("record %d", index)
+
+        threads = [threading.Thread(target=log_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(structured_logging.get_logging_stats()['queued'], 4000)
+        self.assertEqual(len(self.records()), 4000)
+
+    def test_access_records(self):
+        """Test that each request logs route, status, duration, cache status and query shape."""
+        structured_logging.configure_logging(sample_rate=1.0, stream=self.stream)
+        countries = [{'code': 'USA', 'name': 'United States', 'region': 'North America'}]
+        with patch('app.get_available_countries', return_value=countries), \
+                patch('app.validate_country_codes', return_value=['USA']), \
+                patch('app.fetch_indicator_data', return_value={'USA': {'2000': 1.0}}):
+            client = app.test_client()
+            client.get('/data/gdp?countries=USA,GBR&start_year=2000&end_year=2004')
+            client.get('/data/gdp?countries=USA,GBR&start_year=2000&end_year=2004')
+
+        access = [record for record in self.records() if record['logger'] == 'access']
+        self.assertEqual(len(access), 2)
+        self.assertEqual(access[0]['route'], '/data/gdp')
+        self.assertEqual(access[0]['status'], 200)
+        self.assertEqual([record['cache'] for record in access], ['MISS', 'HIT'])
+        self.assertGreaterEqual(access[0]['duration_ms'], 0)
+        # Resolved values, also for the cache hit: GBR was dropped as invalid
+        self.assertEqual([record['country_count'] for record in access], [1, 1])
+        self.assertEqual([record['year_span'] for record in access], [5, 5])
+
+    def test_access_records_use_resolved_defaults(self):
+        """Test that default countries and years are logged for requests that do not give them."""
+        structured_logging.configure_logging(sample_rate=1.0, stream=self.stream)
+        countries = [{'code': 'USA', 'name': 'United States', 'region': 'North America'},
+                     {'code': 'GBR', 'name': 'United Kingdom', 'region': 'Europe & Central Asia'}]
+        with patch('app.validate_country_codes', side_effect=lambda codes: codes), \
+                patch('app.fetch_combined_data', return_value={}), \
+                patch('app.get_available_countries', return_value=countries), \
+                patch('app.fetch_region_aggregates', return_value={'regions': {}}):
+            client = app.test_client()
+            client.get('/data')
+            client.get('/data/gdp?aggregate=region&start_year=2000&end_year=2001')
+
+        access = [record for record in self.records() if record['logger'] == 'access']
+        self.assertEqual([record['country_count'] for record in access], [len(data_fetcher.DEFAULT_COUNTRIES), 2])
+        self.assertEqual([record['year_span'] for record in access], [64, 2])
+
+    def test_error_access_records_not_sampled(self):
+        """Test that non-2xx access records are kept when successful ones are sampled out."""
+        structured_logging.configure_logging(sample_rate=0.0, stream=self.stream)
+        with patch('app.validate_country_codes', return_value=['USA']), \
+                patch('app.fetch_indicator_data', side_effect=Exception("API Error")):
+            client = app.test_client()
+            client.get('/health')
+            client.get('/data/gdp?countries=USA')
+            client.get('/data/gdp')
+
+        access = [record for record in self.records() if record['logger'] == 'access']
+        self.assertEqual([record['status'] for record in access], [500, 400])
+        self.assertEqual(access[0]['country_count'], 1)
+        self.assertIsNone(access[1]['country_count'])
+
+    def test_asgi_access_records(self):
+        """Test that the ASGI app logs the resolved country count and year span, also on cache hits."""
+        stub = StubWorldBank().start()
+        self.addCleanup(stub.stop)
+        structured_logging.configure_logging(sample_rate=1.0, stream=self.stream)
+        asgi_app.response_cache.clear()
+
+        with patch.dict(os.environ, {'GDP_VIZ_UPSTREAM': stub.endpoint}), \
+                TestClient(asgi_app.app) as client:
+            client.get('/data/gdp?countries=USA,XXX&start_year=2000&end_year=2002')
+            client.get('/data/gdp?countries=USA,XXX&start_year=2000&end_year=2002')
+
+        access = [record for record in self.records() if record['logger'] == 'access']
+        self.assertEqual([record['cache'] for record in access], ['MISS', 'HIT'])
+        self.assertEqual([record['country_count'] for record in access], [1, 1])
+        self.assertEqual([record['year_span'] for record in access], [3, 3])
+
+
+class TestGapFill(unittest.TestCase):
+    """Test gap filling of per-country series and the fill parameter."""
+
+    SNAPSHOT = {
+        'format': snapshot.SNAPSHOT_FORMAT,
+        'created_at': '2024-01-01T00:00:00+00:00',
+        'start_year': 2000,
+        'end_year': 2005,
+        'countries': [
+            {'code': 'USA', 'name': 'United States', 'region': 'North America'},
+            {'code': 'GBR', 'name': 'United Kingdom', 'region': 'Europe & Central Asia'},
+        ],
+        'indicators': {
+            'gdp': {'USA': {'2000': 100.0, '2003': 800.0}, 'GBR': {'2001': 50.0, '2002': 60.0}},
+            'fertility': {'USA': {'2000': 2.0, '2004': 1.6}, 'GBR': {'2002': 1.8}},
+        },
+    }
+
+    def setUp(self):
+        """Start each test with empty caches and no snapshot."""
+        gap_fill.clear_fill_cache()
+        response_cache.clear()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """Stop serving the test snapshot."""
+        dataset.clear_snapshot()
+
+    def test_fill_modes(self):
+        """Test interpolation, log-linear and carry-forward on a country x year array."""
+        nan = float('nan')
+        values = gap_fill.np.array([[nan, 1.0, nan, nan, 8.0, nan]])
+
+        filled, imputed = gap_fill.fill_matrix(values * 3 - 1, 'linear')
+        self.assertEqual(filled[0, 1:5].tolist(), [2.0, 9.0, 16.0, 23.0])
+        self.assertEqual(imputed[0].tolist(), [False, False, True, True, False, False])
+
+        filled, _ = gap_fill.fill_matrix(values, 'log-linear', log_scale=True)
+        self.assertAlmostEqual(filled[0, 2], 2.0)
+        self.assertAlmostEqual(filled[0, 3], 4.0)
+
+        # Trailing carry-forward stops at the last year any country observed
+        latest = gap_fill.np.array([[nan, nan, nan, nan, nan, 3.0, nan]])
+        filled, imputed = gap_fill.fill_matrix(gap_fill.np.vstack([gap_fill.np.append(values, nan), latest]),
+                                               'carry-forward')
+        self.assertEqual(filled[0, 1:6].tolist(), [1.0, 1.0, 1.0, 8.0, 8.0])
+        self.assertTrue(gap_fill.np.isnan(filled[0, 0]))
+        self.assertTrue(gap_fill.np.isnan(filled[:, 6]).all())
+        self.assertEqual(imputed[0].tolist(), [False, False, True, True, False, True, False])
+        self.assertFalse(imputed[1].any())
+
+        with self.assertRaises(ValueError):
+            gap_fill.fill_matrix(values, 'spline')
+
+    def test_fill_series_mask(self):
+        """Test that dense series omit leading gaps and list imputed years."""
+        series = {'USA': {'2000': 100.0, '2003': 400.0}, 'GBR': {'2001': 50.0, '2002': 60.0}, 'FRA': {}}
+        dense, mask = gap_fill.fill_series(series, ['USA', 'GBR', 'FRA'], 2000, 2005, 'linear')
+
+        self.assertEqual(list(dense), ['USA', 'GBR'])
+        self.assertEqual(dense['USA'], {'2000': 100.0, '2001': 200.0, '2002': 300.0, '2003': 400.0})
+        self.assertEqual(dense['GBR'], {'2001': 50.0, '2002': 60.0})
+        self.assertEqual(mask, {'USA': ['2001', '2002']})
+
+    def test_data_endpoint_fill(self):
+        """Test that /data?fill= returns dense series with imputed years per country."""
+        gdp = {'USA': {'2000': 100.0, '2002': 300.0}, 'GBR': {'2000': 50.0}}
+        fertility = {'USA': {'2000': 2.0, '2001': 1.9}, 'GBR': {'2000': 1.7, '2002': 1.6}}
+        with patch('app.validate_country_codes', return_value=['USA', 'GBR']), \
+                patch('data_fetcher.fetch_gdp_data', return_value=gdp), \
+                patch('data_fetcher.fetch_fertility_data', return_value=fertility):
+            data = json.loads(self.client.get(
+                '/data?countries=USA,GBR&start_year=2000&end_year=2004&fill=carry-forward').data)
+
+        self.assertEqual(data['metadata']['fill'], 'carry-forward')
+        self.assertEqual(data['countries']['USA']['gdp'], {'2000': 100.0, '2001': 100.0, '2002': 300.0})
+        self.assertEqual(data['countries']['USA']['fertility']['2002'], 1.9)
+        self.assertEqual(data['countries']['USA']['imputed'], {'gdp': ['2001'], 'fertility': ['2002']})
+        # Nothing is carried past 2002, the latest year either indicator reports
+        self.assertEqual(data['countries']['GBR']['gdp'], {'2000': 50.0, '2001': 50.0, '2002': 50.0})
+        self.assertEqual(data['countries']['GBR']['imputed'], {'gdp': ['2001', '2002'], 'fertility': ['2001']})
+
+    def test_live_fill_uses_fetched_data(self):
+        """Test that without a snapshot each fetch is filled rather than served from an earlier fill."""
+        path = '/data?countries=USA&start_year=2000&end_year=2002&fill=linear'
+        with patch('app.validate_country_codes', return_value=['USA']), \
+                patch('data_fetcher.fetch_fertility_data', return_value={}), \
+                patch('data_fetcher.fetch_gdp_data', return_value={'USA': {'2000': 1.0, '2002': 1.0}}):
+            self.client.get(path)
+
+        response_cache.clear()
+        with patch('app.validate_country_codes', return_value=['USA']), \
+                patch('data_fetcher.fetch_fertility_data', return_value={}), \
+                patch('data_fetcher.fetch_gdp_data', return_value={'USA': {'2000': 5.0, '2002': 5.0}}):
+            data = json.loads(self.client.get(path).data)
+
+        self.assertEqual(data['countries']['USA']['gdp'], {'2000': 5.0, '2001': 5.0, '2002': 5.0})
+
+    def test_snapshot_fill_cached_per_version(self):
+        """Test that the snapshot is filled once per dataset version and sliced per request."""
+        dataset.publish_snapshot(self.SNAPSHOT)
+        with patch('data_fetcher.fill_series', wraps=gap_fill.fill_series) as fill_series:
+            first = json.loads(self.client.get('/data/gdp?countries=USA&start_year=2001&end_year=2002&fill=log-linear').data)
+            second = json.loads(self.client.get('/data/gdp?countries=USA,GBR&start_year=2000&end_year=2005&fill=log-linear').data)
+            self.assertEqual(fill_series.call_count, 1)
+
+            dataset.publish_snapshot(self.SNAPSHOT)
+            self.client.get('/data/gdp?countries=USA&start_year=2001&end_year=2002&fill=log-linear')
+            self.assertEqual(fill_series.call_count, 2)
+
+        # Gaps at the edge of the requested range are filled from observations outside it
+        self.assertAlmostEqual(first['data']['USA']['2001'], 200.0)
+        self.assertAlmostEqual(first['data']['USA']['2002'], 400.0)
+        self.assertEqual(first['imputed'], {'USA': ['2001', '2002']})
+        self.assertEqual(second['fill'], 'log-linear')
+        self.assertNotIn('GBR', second['imputed'])
+
+    def test_invalid_fill(self):
+        """Test that unknown modes and fill with aggregate are rejected."""
+        for path in ('/data?fill=spline', '/data/gdp?countries=USA&fill=spline', '/data?aggregate=region&fill=linear'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(json.loads(response.data)['error'], 'Invalid parameters')
+
+
+class TestIndicatorRegistry(unittest.TestCase):
+    """Test the indicator registry, bulk ingestion and the generic indicator routes."""
+
+    def setUp(self):
+        """Point upstream calls at a local stub World Bank API."""
+        self.endpoint = data_fetcher.wb.endpoint
+        self.stub = StubWorldBank().start()
+        upstream.configure_upstream(endpoint=self.stub.endpoint)
+        response_cache.clear()
+        asgi_app.response_cache.clear()
+
+    def tearDown(self):
+        """Drop any published snapshot and restore the real endpoint."""
+        dataset.clear_snapshot()
+        self.stub.stop()
+        upstream.configure_upstream(endpoint=self.endpoint)
+
+    @patch('app.fetch_indicator_data')
+    @patch('app.validate_country_codes')
+    def test_fetch_errors_keep_route_messages(self, mock_validate, mock_fetch):
+        """Test that failed fetches report the messages the GDP and fertility routes always used."""
+        mock_validate.return_value = ['USA']
+        mock_fetch.side_effect = Exception("API Error")
+        client = app.test_client()
+
+        for name, error in [('gdp', 'Failed to fetch GDP data'), ('fertility', 'Failed to fetch fertility data'),
+                            ('life_expectancy', 'Failed to fetch life_expectancy data')]:
+            response = client.get(f'/data/{name}?countries=USA')
+            self.assertEqual(response.status_code, 500)
+            self.assertEqual(json.loads(response.data)['error'], error)
+
+    def test_register_indicator(self):
+        """Test registration, validation and the scale used for log-linear filling."""
+        self.assertEqual(indicators.get_indicator('life_expectancy').code, 'SP.DYN.LE00.IN')
+        self.assertEqual(data_fetcher.GDP_INDICATOR, indicators.get_indicator('gdp').code)
+
+        indicator = indicators.register_indicator('co2', 'EN.ATM.CO2E.PC', 'CO2 emissions', 'tonnes per capita', 'log')
+        self.addCleanup(indicators.INDICATORS.pop, 'co2')
+        self.assertIn(indicator, indicators.list_indicators())
+
+        with self.assertRaises(ValueError):
+            indicators.register_indicator('CO2/x', 'EN.ATM.CO2E.PC', 'CO2 emissions', 'tonnes per capita')
+        with self.assertRaises(ValueError):
+            indicators.register_indicator('co2', 'EN.ATM.CO2E.PC', 'CO2 emissions', 'tonnes per capita', 'sqrt')
+
+        gap_fill.clear_fill_cache()
+        series = {'USA': {'2000': 1.0, '2002': 4.0}}
+        dense, _ = data_fetcher.fill_indicator_data('co2', series, ['USA'], 2000, 2002, 'log-linear')
+        self.assertAlmostEqual(dense['USA']['2001'], 2.0)
+        dense, _ = data_fetcher.fill_indicator_data('fertility', series, ['USA'], 2000, 2002, 'log-linear')
+        self.assertAlmostEqual(dense['USA']['2001'], 2.5)
+
+    def test_ingest_matches_sequential_fetch(self):
+        """Test that batched parallel ingestion returns the same series as one fetch per indicator."""
+        self.stub.latency = 0.05
+        codes = [country[0] for country in STUB_COUNTRIES]
+        names = ['gdp', 'life_expectancy']
+
+        started = ingest.time.perf_counter()
+        data, stats = ingest.ingest_indicators(names, codes, 2000, 2010, batch_size=10)
+        elapsed = ingest.time.perf_counter() - started
+
+        for name in names:
+            self.assertEqual(data[name], data_fetcher.fetch_indicator_data(name, codes, 2000, 2010, live=True))
+            self.assertEqual(stats[name]['batches'], 4)
+            self.assertEqual(stats[name]['countries'], len(codes))
+            self.assertEqual(stats[name]['observations'], sum(len(values) for values in data[name].values()))
+            self.assertGreater(stats[name]['memory_bytes'], stats[name]['observations'] * 24)
+        self.assertEqual(data['life_expectancy']['USA']['2000'], stub_value('SP.DYN.LE00.IN', 'USA', 2000))
+        # Eight batches of at least one 50 ms round trip each, run in parallel
+        self.assertGreaterEqual(stats['gdp']['fetch_seconds'], 4 * 0.05)
+        self.assertLess(elapsed, 8 * 0.05)
+
+        with self.assertRaises(KeyError):
+            ingest.ingest_indicators(['unknown'], codes, 2000, 2010)
+
+    def test_snapshot_and_indicators_endpoint(self):
+        """Test that snapshots hold every registered indicator with stats reported by /indicators."""
+        job_runner = refresher.DatasetRefresher()
+        job_runner.refresh_all()
+        built = dataset.get_snapshot()
+        self.assertEqual(set(built['indicators']), set(indicators.INDICATORS))
+
+        listed = json.loads(app.test_client().get('/indicators').data)['indicators']
+        by_name = {indicator['name']: indicator for indicator in listed}
+        self.assertEqual(by_name['life_expectancy']['unit'], 'years')
+        self.assertTrue(by_name['gdp']['loaded'])
+        self.assertEqual(by_name['gdp']['stats'], built['indicator_stats']['gdp'])
+
+        served_before = self.stub.requests_served
+        job_runner.ingest(['life_expectancy'])
+        self.assertIs(dataset.get_snapshot()['indicators']['gdp'], built['indicators']['gdp'])
+        self.assertGreater(self.stub.requests_served, served_before)
+
+        # Snapshots written before stats were recorded are measured on demand
+        legacy = dict(built, indicator_stats={})
+        legacy['indicators'] = {'gdp': built['indicators']['gdp']}
+        described = {indicator['name']: indicator for indicator in ingest.describe_indicators(legacy)}
+        self.assertEqual(described['gdp']['stats']['observations'], built['indicator_stats']['gdp']['observations'])
+        self.assertIsNone(described['gdp']['stats']['fetch_seconds'])
+        self.assertFalse(described['fertility']['loaded'])
+
+    def test_generic_indicator_route(self):
+        """Test /data/<indicator> for a newly served series on both apps, and unknown names."""
+        paths = [
+            '/data/life_expectancy?countries=USA,GBR&start_year=2000&end_year=2003',
+            '/data/population?aggregate=region&start_year=2000&end_year=2001',
+        ]
+        flask_client = app.test_client()
+        with patch.dict(os.environ, {'GDP_VIZ_UPSTREAM': self.stub.endpoint}), \
+                TestClient(asgi_app.app) as client:
+            for path in paths:
+                response = client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), json.loads(flask_client.get(path).data))
+
+            data = client.get(paths[0]).json()
+            self.assertEqual(data['data_type'], 'life_expectancy')
+            self.assertEqual(data['data']['USA']['2003'], stub_value('SP.DYN.LE00.IN', 'USA', 2003))
+
+            response = client.get('/data/unknown?countries=USA')
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json(), json.loads(flask_client.get('/data/unknown?countries=USA').data))
+            self.assertEqual(response.json()['error'], 'Unknown indicator')
+
+        self.assertEqual(flask_client.get(paths[0]).headers['X-Cache'], 'HIT')
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file